@@ -1,32 +1,57 @@
+import atexit
+import functools
 import hmac
 import hashlib
 import os
 import re
+import select
+import shutil
 import subprocess
-from typing import Set, Optional
-
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, FrozenSet, Set, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
 from flask import Flask, request, abort, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest, Unauthorized, default_exceptions
 from pathlib import Path
-import os
 from dotenv import load_dotenv
-from pathlib import Path
-import shlex
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, quote
+import urllib.request
 
 # Sentry error monitoring
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
+from sentry_sdk.scrubber import EventScrubber, DEFAULT_DENYLIST
 
 SENTRY_DSN = os.environ.get("SENTRY_DSN", "")
 
 # Server identification: Set PLANTSWIPE_SERVER_NAME to 'DEV' or 'MAIN' on each server
 SERVER_NAME = os.environ.get("PLANTSWIPE_SERVER_NAME") or os.environ.get("SERVER_NAME") or "unknown"
 
+# Keys whose values Sentry's EventScrubber replaces, on top of the SDK defaults
+_SENTRY_DENYLIST = DEFAULT_DENYLIST + [
+    "x-admin-token",
+    "x_admin_token",
+    "x-button-token",
+    "x_button_token",
+    "pgpassword",
+    "supabase_service_role_key",
+]
+# Request headers kept on Sentry events; every other header is dropped
+_SENTRY_SAFE_HEADERS = frozenset({"Content-Type", "Accept", "User-Agent"})
+
+
 def _init_sentry() -> None:
     """Initialize Sentry for error tracking in the Admin API.
     
     GDPR Compliance Notes:
     - send_default_pii is False to avoid capturing user IP addresses and cookies
+    - EventScrubber filters secret-named keys recursively
     - Error scrubbing removes email patterns from error messages
     - Only operational metadata is captured, no personal data
     """
@@ -45,11 +70,18 @@ def _init_sentry() -> None:
             _experiments={
                 "enable_logs": True,
             },
-            # Tracing - capture 20% of transactions in production (cost-effective)
-            traces_sample_rate=0.2,
+            # Tracing - capture 20% of transactions in production (cost-effective),
+            # none for health probes or while maintenance mode is active
+            traces_sampler=_traces_sampler,
             # GDPR: Do NOT send PII automatically
             # This prevents IP addresses, cookies, and request data from being sent
             send_default_pii=False,
+            # GDPR: Let the SDK filter secret-named keys at any depth (request data,
+            # extras, local variables) before our before_send regex pass runs
+            event_scrubber=EventScrubber(denylist=_SENTRY_DENYLIST, recursive=True),
+            # Expected client errors (auth failures, malformed input) are dropped by
+            # type before the SDK prepares and scrubs the event
+            ignore_errors=[Unauthorized, BadRequest],
             # Filter out common non-actionable errors
             before_send=_sentry_before_send,
             # GDPR: Scrub sensitive data from events
@@ -63,19 +95,38 @@ def _init_sentry() -> None:
         print(f"[Sentry] Failed to initialize: {e}")
 
 
+# PII patterns are folded into one alternation so a single scan handles every kind;
+# _scrub_pii_from_string runs on every Sentry event.
+# email: only tried where a local-part run begins, so long runs with no "@" (hashes,
+#   paths, base64) are scanned once instead of re-tried from every position
+# password: key (password or "password" or 'password') + separator + value (double/single quoted or unquoted)
+# bearer: the whole token68 charset plus "@", so an address-shaped token is redacted
+#   in one piece instead of leaving its domain behind
+_PII_RE = re.compile(
+    r'(?<![a-zA-Z0-9._%+-])(?P<email>[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
+    r'|(?P<password>(?P<pw_key>(?P<pw_quote>["\']?)(?i:password)(?P=pw_quote)\s*[:=]\s*)(?:".*?"|\'.*?\'|[^&"\s]+))'
+    r'|(?P<bearer>Bearer\s+[A-Za-z0-9\-_\.~+/@%]+=*)'
+)
+
+
+def _redact_pii_match(match: "re.Match[str]") -> str:
+    kind = match.lastgroup
+    if kind == "email":
+        return "[EMAIL_REDACTED]"
+    if kind == "password":
+        return f'{match.group("pw_key")}"[REDACTED]"'
+    return "Bearer [REDACTED]"
+
+
 def _scrub_pii_from_string(value: str) -> str:
-    """Scrub PII patterns from a string."""
-    import re
+    """Scrub PII patterns (emails, passwords, bearer tokens) from a string."""
     if not value:
         return value
-    # Scrub email addresses
-    value = re.sub(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', '[EMAIL_REDACTED]', value)
-    # Scrub potential passwords in URLs, logs, JSON, or Python dict strings
-    # Matches: key (password or "password" or 'password') + separator + value (double/single quoted or unquoted)
-    value = re.sub(r'((["\']?)password\2\s*[:=]\s*)(".*?"|\'.*?\'|[^&"\s]+)', r'\1"[REDACTED]"', value, flags=re.IGNORECASE)
-    # Scrub bearer tokens
-    value = re.sub(r'Bearer\s+[A-Za-z0-9\-_\.]+', 'Bearer [REDACTED]', value)
-    return value
+    # Most event strings hold no PII: plain substring checks are far cheaper than
+    # running the regex over a long traceback. casefold() mirrors the (?i:) match.
+    if "@" not in value and "Bearer" not in value and "password" not in value.casefold():
+        return value
+    return _PII_RE.sub(_redact_pii_match, value)
 
 
 # ========================================
@@ -84,32 +135,114 @@ def _scrub_pii_from_string(value: str) -> str:
 import json
 import time
 
+try:
+    import orjson
+except ImportError:  # orjson is in requirements.txt; stdlib json keeps dev setups working
+    orjson = None
+
+
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
 MAINTENANCE_MODE_FILE = "/tmp/plantswipe-maintenance.json"
 
 
-def _get_maintenance_mode() -> dict:
+def _atomic_write_bytes(path: str, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so concurrent readers see either the old or the new file."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Parsed maintenance file, keyed by mtime. Sentry calls _get_maintenance_mode for
+# every event, so within the TTL we skip the stat entirely.
+_MAINT_CACHE_TTL = 1.0
+_MAINT_CACHE = {"mtime": -1, "data": None, "checked_at": 0.0}
+
+
+def _invalidate_maintenance_cache() -> None:
+    _MAINT_CACHE["mtime"] = -1
+    _MAINT_CACHE["data"] = None
+    _MAINT_CACHE["checked_at"] = 0.0
+
+
+def _read_maintenance_file(max_age: float = _MAINT_CACHE_TTL) -> Optional[dict]:
+    """Return the parsed maintenance file, or None if it does not exist.
+
+    Within ``max_age`` seconds of the last check the cached result is returned
+    without touching the filesystem; after that a stat decides whether to re-parse.
+    """
+    now = time.monotonic()
+    if now - _MAINT_CACHE["checked_at"] < max_age:
+        return _MAINT_CACHE["data"]
+    try:
+        mtime = os.stat(MAINTENANCE_MODE_FILE).st_mtime_ns
+    except FileNotFoundError:
+        mtime, data = -1, None
+    else:
+        if mtime == _MAINT_CACHE["mtime"]:
+            data = _MAINT_CACHE["data"]
+        else:
+            with open(MAINTENANCE_MODE_FILE, "rb") as f:
+                data = _json_loads(f.read())
+    _MAINT_CACHE["mtime"] = mtime
+    _MAINT_CACHE["data"] = data
+    _MAINT_CACHE["checked_at"] = now
+    return data
+
+
+def _get_maintenance_mode(max_age: float = _MAINT_CACHE_TTL) -> dict:
     """Check if maintenance mode is currently active.
     Returns { active: bool, expiresAt?: int, reason?: str }
     """
     try:
-        if not os.path.exists(MAINTENANCE_MODE_FILE):
+        data = _read_maintenance_file(max_age)
+        if data is None:
             return {"active": False}
-        with open(MAINTENANCE_MODE_FILE, "r") as f:
-            data = json.load(f)
         # Check if maintenance mode has expired
         expires_at = data.get("expiresAt", 0)
-        if expires_at and time.time() * 1000 > expires_at:
+        if expires_at and time.time_ns() // 1_000_000 > expires_at:
             # Expired - clean up the file
             try:
                 os.unlink(MAINTENANCE_MODE_FILE)
             except Exception:
                 pass
+            _invalidate_maintenance_cache()
             return {"active": False}
         return {"active": True, **data}
     except Exception:
         return {"active": False}
 
 
+# Error message tokens that are expected while services restart during maintenance
+_MAINTENANCE_HTTP_ERROR_RE = re.compile("|".join(map(re.escape, (
+    "400", "502", "503", "504", "Bad Gateway", "Service Unavailable", "Gateway Timeout",
+))))
+_MAINTENANCE_CONN_ERROR_RE = re.compile("|".join(map(re.escape, (
+    "ECONNREFUSED", "ECONNRESET", "ETIMEDOUT", "socket hang up", "Connection refused",
+))))
+
+
 def _should_suppress_maintenance_error(event, hint) -> bool:
     """Check if an error should be suppressed during maintenance mode.
     Suppresses 502, 503, 504 errors which are expected during service restarts.
@@ -120,18 +253,15 @@ def _should_suppress_maintenance_error(event, hint) -> bool:
     
     error = hint.get("exc_info", [None, None, None])[1] if hint else None
     
-    # Check for HTTP status codes in the error
-    status_codes = [400, 502, 503, 504]
-    
-    # Check error message for status codes
+    # Check error message for HTTP status codes / gateway phrases in a single scan
     if error:
         msg = str(error)
-        for code in status_codes:
-            if str(code) in msg or "Bad Gateway" in msg or "Service Unavailable" in msg or "Gateway Timeout" in msg:
-                print(f"[Sentry] Suppressing {code}-related error during maintenance: {msg[:100]}")
-                return True
+        match = _MAINTENANCE_HTTP_ERROR_RE.search(msg)
+        if match:
+            print(f"[Sentry] Suppressing {match.group(0)}-related error during maintenance: {msg[:100]}")
+            return True
         # Also suppress connection-related errors during maintenance
-        if any(term in msg for term in ["ECONNREFUSED", "ECONNRESET", "ETIMEDOUT", "socket hang up", "Connection refused"]):
+        if _MAINTENANCE_CONN_ERROR_RE.search(msg):
             print(f"[Sentry] Suppressing connection error during maintenance: {msg[:100]}")
             return True
     
@@ -187,10 +317,9 @@ def _sentry_before_send(event, hint):
     # Don't send request headers (may contain auth tokens)
     if event.get("request", {}).get("headers"):
         # Only keep safe headers
-        safe_headers = {"Content-Type", "Accept", "User-Agent"}
         event["request"]["headers"] = {
             k: v for k, v in event["request"]["headers"].items() 
-            if k in safe_headers
+            if k in _SENTRY_SAFE_HEADERS
         }
     
     # Add operational context for debugging
@@ -214,6 +343,24 @@ def _sentry_before_send_transaction(event, hint):
     return event
 
 
+TRACES_SAMPLE_RATE = 0.2
+# Probe routes that never need a performance transaction
+_UNTRACED_PATHS = frozenset({"/health"})
+
+
+def _traces_sampler(sampling_context) -> float:
+    """Decide the sample rate per transaction."""
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    path = (sampling_context.get("wsgi_environ") or {}).get("PATH_INFO", "")
+    if path in _UNTRACED_PATHS:
+        return 0.0
+    if _get_maintenance_mode().get("active"):
+        return 0.0
+    return TRACES_SAMPLE_RATE
+
+
 # Initialize Sentry before Flask app is created
 _init_sentry()
 
@@ -225,48 +372,54 @@ def _get_env_var(name: str, default: Optional[str] = None) -> str:
     return value
 
 
-def _parse_allowed_services(env_value: str) -> Set[str]:
-    services: Set[str] = set()
-    for raw in env_value.split(","):
-        candidate = raw.strip()
-        if not candidate:
-            continue
-        # Normalize both forms: with or without .service suffix
-        if candidate.endswith(".service"):
-            services.add(candidate[:-8])
-        services.add(candidate)
-    return services
+# One comma-separated entry with surrounding whitespace excluded
+_SERVICE_NAME_RE = re.compile(r"[^,\s](?:[^,]*[^,\s])?")
+
+
+def _parse_allowed_services(env_value: str) -> FrozenSet[str]:
+    # Store both forms (with and without .service suffix) so lookups are a single membership test
+    names = {
+        name[:-8] if name.endswith(".service") else name
+        for name in _SERVICE_NAME_RE.findall(env_value)
+    }
+    return frozenset(names.union(f"{name}.service" for name in names))
 
 
 HMAC_HEADER = "X-Button-Token"
+STATIC_TOKEN_HEADER = "X-Admin-Token"
+# WSGI environ keys for the auth headers, so _verify_request can skip Werkzeug's
+# per-lookup header name normalization
+_HMAC_ENVIRON_KEY = "HTTP_" + HMAC_HEADER.upper().replace("-", "_")
+_STATIC_TOKEN_ENVIRON_KEY = "HTTP_" + STATIC_TOKEN_HEADER.upper().replace("-", "_")
+
+# Directory of this file (admin_api/); its parent is the default repo root
+_APP_DIR = Path(__file__).resolve().parent
 
 # Load .env files from the repo's plant-swipe directory to unify configuration
 # IMPORTANT: This MUST be called BEFORE reading config variables
+# Map common aliases so Admin API can reuse same env file: target <- first set source
+_ENV_ALIASES = (
+    ("DATABASE_URL", ("DB_URL", "PG_URL", "POSTGRES_URL", "POSTGRES_PRISMA_URL", "SUPABASE_DB_URL")),
+    ("SUPABASE_URL", ("VITE_SUPABASE_URL", "REACT_APP_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_URL")),
+    ("SUPABASE_DB_PASSWORD", ("PGPASSWORD", "POSTGRES_PASSWORD")),
+    ("ADMIN_STATIC_TOKEN", ("VITE_ADMIN_STATIC_TOKEN",)),
+)
+
+
 def _load_repo_env():
     try:
-        here = Path(__file__).resolve().parent
         # repo root is parent of admin_api
-        repo = here.parent
-        # Prefer plant-swipe/.env and .env.server if present
-        env1 = repo / 'plant-swipe' / '.env'
-        env2 = repo / 'plant-swipe' / '.env.server'
-        if env1.is_file():
-            load_dotenv(dotenv_path=str(env1), override=False)
-        if env2.is_file():
-            load_dotenv(dotenv_path=str(env2), override=False)
-        # Map common aliases so Admin API can reuse same env file
-        def prefer_env(target: str, sources: list[str]) -> None:
-            if os.environ.get(target):
-                return
-            for k in sources:
-                v = os.environ.get(k)
-                if v:
-                    os.environ[target] = v
-                    return
-        prefer_env('DATABASE_URL', ['DB_URL', 'PG_URL', 'POSTGRES_URL', 'POSTGRES_PRISMA_URL', 'SUPABASE_DB_URL'])
-        prefer_env('SUPABASE_URL', ['VITE_SUPABASE_URL', 'REACT_APP_SUPABASE_URL', 'NEXT_PUBLIC_SUPABASE_URL'])
-        prefer_env('SUPABASE_DB_PASSWORD', ['PGPASSWORD', 'POSTGRES_PASSWORD'])
-        prefer_env('ADMIN_STATIC_TOKEN', ['VITE_ADMIN_STATIC_TOKEN'])
+        repo = _APP_DIR.parent
+        # Prefer plant-swipe/.env and .env.server if present; load_dotenv skips missing files
+        for name in (".env", ".env.server"):
+            load_dotenv(dotenv_path=str(repo / "plant-swipe" / name), override=False)
+        env = os.environ
+        for target, sources in _ENV_ALIASES:
+            if env.get(target):
+                continue
+            value = next((v for v in map(env.get, sources) if v), None)
+            if value:
+                env[target] = value
     except Exception:
         pass
 
@@ -275,7 +428,15 @@ _load_repo_env()
 
 # Now read config variables AFTER env files are loaded
 APP_SECRET = _get_env_var("ADMIN_BUTTON_SECRET", "change-me")
+# HMAC key for X-Button-Token, encoded once rather than per request. The keyed
+# prototype already holds the ipad/opad state; requests only copy() it. Naming
+# the digest as a string keeps it on OpenSSL's HMAC implementation.
+_APP_SECRET_BYTES = APP_SECRET.encode("utf-8")
+_HMAC_PROTO = hmac.new(_APP_SECRET_BYTES, digestmod="sha256")
+_HMAC_HEX_LEN = 2 * _HMAC_PROTO.digest_size
 ADMIN_STATIC_TOKEN = _get_env_var("ADMIN_STATIC_TOKEN", "")
+_STATIC_TOKEN_BYTES = ADMIN_STATIC_TOKEN.encode("utf-8")
+_STATIC_TOKEN_ENABLED = int(bool(_STATIC_TOKEN_BYTES))
 # Allow nginx, node app, and admin api by default; can be overridden via env
 ALLOWED_SERVICES_RAW = _get_env_var("ADMIN_ALLOWED_SERVICES", "nginx,plant-swipe-node,admin-api")
 DEFAULT_SERVICE = _get_env_var("ADMIN_DEFAULT_SERVICE", "plant-swipe-node")
@@ -285,90 +446,202 @@ ALLOWED_SERVICES = _parse_allowed_services(ALLOWED_SERVICES_RAW)
 app = Flask(__name__)
 
 
-# JSON error handlers for proper API responses
+class _OrjsonProvider(DefaultJSONProvider):
+    """Flask's default JSON provider with orjson doing the encoding.
+
+    Only dumps() is overridden, so response() and loads() keep Flask's behaviour
+    (including NaN/Infinity in request bodies). Output matches the default
+    (sorted keys, same fallbacks for dates, UUIDs and dataclasses); anything
+    orjson cannot encode, or indented output, goes through the stdlib path.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs.get("indent") is None and not kwargs.get("cls"):
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if kwargs.get("sort_keys", self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+        return super().dumps(obj, **kwargs)
+
+
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
+
+
+# JSON error handlers for proper API responses.
+# Bodies for the default werkzeug descriptions are serialized once, since a bare
+# abort(401) from unauthenticated traffic is by far the most common error.
+_STATIC_ERROR_BODIES = {
+    code: _json_dumps_bytes({"ok": False, "error": name, "message": default_exceptions[code].description})
+    for code, name in ((400, "Bad Request"), (401, "Unauthorized"), (403, "Forbidden"), (404, "Not Found"), (500, "Internal Server Error"))
+}
+
+
+def _json_error(code: int, name: str, error):
+    description = getattr(error, 'description', name)
+    if description == default_exceptions[code].description:
+        return Response(_STATIC_ERROR_BODIES[code], status=code, mimetype="application/json")
+    return jsonify({"ok": False, "error": name, "message": description}), code
+
+
 @app.errorhandler(400)
 def bad_request_handler(error):
-    description = getattr(error, 'description', 'Bad Request')
-    return jsonify({"ok": False, "error": "Bad Request", "message": description}), 400
+    return _json_error(400, "Bad Request", error)
 
 
 @app.errorhandler(401)
 def unauthorized_handler(error):
-    description = getattr(error, 'description', 'Unauthorized')
-    return jsonify({"ok": False, "error": "Unauthorized", "message": description}), 401
+    return _json_error(401, "Unauthorized", error)
 
 
 @app.errorhandler(403)
 def forbidden_handler(error):
-    description = getattr(error, 'description', 'Forbidden')
-    return jsonify({"ok": False, "error": "Forbidden", "message": description}), 403
+    return _json_error(403, "Forbidden", error)
 
 
 @app.errorhandler(404)
 def not_found_handler(error):
-    description = getattr(error, 'description', 'Not Found')
-    return jsonify({"ok": False, "error": "Not Found", "message": description}), 404
+    return _json_error(404, "Not Found", error)
 
 
 @app.errorhandler(500)
 def internal_error_handler(error):
-    description = getattr(error, 'description', 'Internal Server Error')
-    return jsonify({"ok": False, "error": "Internal Server Error", "message": description}), 500
+    return _json_error(500, "Internal Server Error", error)
+
+
+# Optional: forward admin actions to Node app for centralized logging.
+# Posts run on a small background pool so a slow Node app never delays admin responses.
+# Entries are coalesced per caller for _LOG_BATCH_DELAY_SECS and sent as one request.
+_LOG_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="admin-log")
+_LOG_MAX_PENDING = 100
+_LOG_BATCH_DELAY_SECS = 0.25
+_LOG_BATCH_MAX = 64
+# Shared keep-alive session so log posts reuse connections to the Node app
+_NODE_SESSION = requests.Session()
+_NODE_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_NODE_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+# Node will infer admin from bearer token; use an internal endpoint
+_NODE_APP_URL = _get_env_var("NODE_APP_URL", "http://127.0.0.1:3000")
+_LOG_URL = f"{_NODE_APP_URL}/api/admin/log-action"
+_LOG_BATCH_URL = f"{_NODE_APP_URL}/api/admin/log-actions"
+_LOG_HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+# Forward static admin token if we have one, so Node can authorize without bearer
+if ADMIN_STATIC_TOKEN:
+    _LOG_HEADERS["X-Admin-Token"] = ADMIN_STATIC_TOKEN
+# Unsent entries keyed by the caller's Authorization header, since Node attributes
+# a whole batch to one admin
+_LOG_BATCHES: dict[str, list] = {}
+_LOG_BATCH_LOCK = threading.Lock()
+_LOG_PENDING = 0
+
+
+def _post_admin_log(url: str, body: bytes, headers: dict) -> None:
+    try:
+        _NODE_SESSION.post(url, data=body, headers=headers, timeout=2)
+    except Exception:
+        pass
+
+
+def _flush_admin_log_batch(token: str) -> None:
+    global _LOG_PENDING
+    time.sleep(_LOG_BATCH_DELAY_SECS)
+    with _LOG_BATCH_LOCK:
+        entries = _LOG_BATCHES.pop(token, [])
+        _LOG_PENDING -= len(entries)
+    headers = {**_LOG_HEADERS, "Authorization": token} if token else _LOG_HEADERS
+    for i in range(0, len(entries), _LOG_BATCH_MAX):
+        chunk = entries[i:i + _LOG_BATCH_MAX]
+        try:
+            res = _NODE_SESSION.post(_LOG_BATCH_URL, data=_json_dumps_bytes({"actions": chunk}), headers=headers, timeout=2)
+        except Exception:
+            continue
+        if res.status_code == 404:
+            # Node app predating the batch endpoint
+            for entry in chunk:
+                _post_admin_log(_LOG_URL, _json_dumps_bytes(entry), headers)
 
 
-# Optional: forward admin actions to Node app for centralized logging
 def _log_admin_action(action: str, target: str = "", detail: dict | None = None) -> None:
+    """Queue an audit entry for the Node app. Best effort: never raises and never blocks."""
+    global _LOG_PENDING
     try:
-        import requests
-        node_url = os.environ.get("NODE_APP_URL", "http://127.0.0.1:3000")
+        # Read request headers here: the Flask request is not available on the worker thread
         token = request.headers.get("Authorization", "")
-        headers = {"Accept": "application/json"}
-        if token:
-            headers["Authorization"] = token
-        # Forward static admin token if we have one, so Node can authorize without bearer
-        static_token = os.environ.get("ADMIN_STATIC_TOKEN", "")
-        if static_token:
-            headers["X-Admin-Token"] = static_token
-        # Node will infer admin from bearer token; use an internal endpoint
-        url = f"{node_url}/api/admin/log-action"
-        payload = {"action": action, "target": target or None, "detail": detail or {}}
-        try:
-            requests.post(url, json=payload, headers=headers, timeout=2)
-        except Exception:
-            pass
+        entry = {"action": action, "target": target or None, "detail": detail or {}}
+        with _LOG_BATCH_LOCK:
+            # Drop the entry rather than queue without bound if Node is unreachable
+            if _LOG_PENDING >= _LOG_MAX_PENDING:
+                return
+            batch = _LOG_BATCHES.setdefault(token, [])
+            batch.append(entry)
+            _LOG_PENDING += 1
+            first = len(batch) == 1
+        if first:
+            _LOG_EXECUTOR.submit(_flush_admin_log_batch, token)
     except Exception:
         pass
 
 
+def _json_body() -> dict:
+    """The request's JSON object, or {} when there is none.
+
+    Bodiless POSTs (the common case for most buttons) and non-JSON bodies never
+    reach the JSON parser, and a non-object payload is treated like an empty one.
+    A missing Content-Length (GET, chunked uploads) still goes to get_json.
+    """
+    if request.content_length == 0 or not request.is_json:
+        return {}
+    body = request.get_json(silent=True)
+    return body if isinstance(body, dict) else {}
+
+
 def _verify_request() -> None:
     # FAIL SECURE: Reject requests if secret is default
     if APP_SECRET == "change-me":
         print("[Security] Rejecting request: APP_SECRET is default 'change-me'. Please configure ADMIN_BUTTON_SECRET.")
         abort(500, description="Server configuration error: Default secret in use.")
 
-    # Option A: HMAC on raw body via X-Button-Token
-    provided_sig = request.headers.get(HMAC_HEADER, "")
+    # Option A: Shared static token header (X-Admin-Token). Checked first because
+    # it is the common case and needs no access to the request body.
+    # The comparison always runs, so timing does not reveal whether a token is
+    # configured or the header was sent; an empty header never equals a set token.
+    static_token = request.environ.get(_STATIC_TOKEN_ENVIRON_KEY, "").encode("utf-8")
+    if hmac.compare_digest(static_token, _STATIC_TOKEN_BYTES) & _STATIC_TOKEN_ENABLED:
+        return
+
+    # Option B: HMAC on raw body via X-Button-Token
+    provided_sig = request.environ.get(_HMAC_ENVIRON_KEY, "")
     if provided_sig:
+        # Anything but 64 hex digits can never match, so it is rejected before
+        # the body is read or hashed
+        if len(provided_sig) != _HMAC_HEX_LEN:
+            abort(401)
+        try:
+            provided = bytes.fromhex(provided_sig)
+        except ValueError:
+            abort(401)
+        # get_data() caches the body so handlers can still parse it afterwards
         body = request.get_data()  # raw bytes
-        computed_sig = hmac.new(APP_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
-        if hmac.compare_digest(provided_sig, computed_sig):
+        mac = _HMAC_PROTO.copy()
+        mac.update(body)
+        # Compare the raw 32-byte digests rather than their hex encodings
+        if hmac.compare_digest(provided, mac.digest()):
             return
-        abort(401)
-
-    # Option B: Shared static token header (X-Admin-Token)
-    static_token = request.headers.get("X-Admin-Token", "")
-    if ADMIN_STATIC_TOKEN and static_token and hmac.compare_digest(static_token, ADMIN_STATIC_TOKEN):
-        return
 
     abort(401)
 
 
 def _is_service_allowed(service_name: str) -> bool:
-    if service_name.endswith(".service"):
-        return service_name in ALLOWED_SERVICES
-    return service_name in ALLOWED_SERVICES or f"{service_name}.service" in ALLOWED_SERVICES
+    return service_name in ALLOWED_SERVICES
 
 
+# Unit actions go through `sudo systemctl`: the service user's rights come from
+# the sudoers allow list setup.sh installs, not from polkit, so it cannot call
+# org.freedesktop.systemd1 over D-Bus itself. These are rare, operator-triggered
+# actions whose time is dominated by the unit restart, not the fork.
 def _restart_service(service_name: str) -> None:
     if not _is_service_allowed(service_name):
         abort(400, description="service not allowed")
@@ -382,32 +655,53 @@ def _reload_nginx() -> None:
 
 def _reboot_machine() -> None:
     subprocess.run(["sudo", "systemctl", "reboot"], check=True, timeout=30)
+
+
+# The git toplevel cannot change while the process runs, so resolve it once.
+# When git cannot resolve it (e.g. app.py deployed outside the checkout), the
+# fallback is served without retrying git for _REPO_ROOT_RETRY_SECS.
+_REPO_ROOT_CACHE: Optional[str] = None
+_REPO_ROOT_LOCK = threading.Lock()
+_REPO_ROOT_RETRY_SECS = 60.0
+_REPO_ROOT_RETRY_AT = 0.0
+
+
 def _get_repo_root() -> str:
+    global _REPO_ROOT_CACHE, _REPO_ROOT_RETRY_AT
     # Prefer explicit env override
     env_dir = _get_env_var("PLANTSWIPE_REPO_DIR", "").strip()
     if env_dir:
         return env_dir
-    here = Path(__file__).resolve().parent
-    # Try git to resolve toplevel
-    try:
-        cmd = [
-            "git",
-            "-c",
-            f"safe.directory={here}",
-            "-C",
-            str(here),
-            "rev-parse",
-            "--show-toplevel",
-        ]
-        out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=5)
-        root = out.decode("utf-8").strip()
-        if root:
-            return root
-    except Exception:
-        pass
+    if _REPO_ROOT_CACHE:
+        return _REPO_ROOT_CACHE
+    here = _APP_DIR
     # Fallback to workspace root (two levels up from this file)
-    fallback = here.parent
-    return str(fallback)
+    fallback = str(here.parent)
+    if time.monotonic() < _REPO_ROOT_RETRY_AT:
+        return fallback
+    with _REPO_ROOT_LOCK:
+        if _REPO_ROOT_CACHE:
+            return _REPO_ROOT_CACHE
+        # Try git to resolve toplevel
+        try:
+            cmd = [
+                "git",
+                "-c",
+                f"safe.directory={here}",
+                "-C",
+                str(here),
+                "rev-parse",
+                "--show-toplevel",
+            ]
+            out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=5)
+            root = out.decode("utf-8").strip()
+            if root:
+                _REPO_ROOT_CACHE = root
+                return root
+        except Exception:
+            pass
+        _REPO_ROOT_RETRY_AT = time.monotonic() + _REPO_ROOT_RETRY_SECS
+    return fallback
 
 
 def _refresh_script_path(repo_root: str) -> str:
@@ -429,6 +723,8 @@ def _ensure_executable(path: str) -> None:
         pass
 
 
+# The layout probe stats the filesystem; the repo root is fixed per process
+@functools.lru_cache(maxsize=4)
 def _sql_sync_parts_dir(repo_root: str) -> str:
     """Get the path to the sync_parts directory containing split SQL files."""
     # Monorepo layout: SQL lives under plant-swipe/supabase/sync_parts/
@@ -441,12 +737,31 @@ def _sql_sync_parts_dir(repo_root: str) -> str:
 
 
 def _get_sql_files_in_order(sync_parts_dir: str) -> list:
-    """Get all SQL files from sync_parts directory, sorted by name."""
-    dir_path = Path(sync_parts_dir)
-    if not dir_path.is_dir():
+    """Get all SQL files from sync_parts directory, sorted by name.
+
+    The NN_ prefixes form a single dependency chain (extensions, then tables,
+    then the RPCs, policies and triggers that reference them), so the files
+    must run sequentially in this order; there are no independent groups to
+    run concurrently.
+    """
+    try:
+        mtime_ns = os.stat(sync_parts_dir).st_mtime_ns
+    except OSError:
         return []
-    sql_files = sorted([f.name for f in dir_path.iterdir() if f.suffix == '.sql'])
-    return sql_files
+    return list(_list_sql_files(sync_parts_dir, mtime_ns))
+
+
+@functools.lru_cache(maxsize=8)
+def _list_sql_files(sync_parts_dir: str, mtime_ns: int) -> tuple:
+    """Sorted *.sql names in a directory; the directory mtime in the key invalidates
+    the entry when files are added, removed or renamed."""
+    try:
+        with os.scandir(sync_parts_dir) as entries:
+            sql_files = [e.name for e in entries if e.name.endswith('.sql') and e.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        return ()
+    sql_files.sort()
+    return tuple(sql_files)
 
 
 def _split_db_url_password(url: str) -> tuple[str, Optional[str]]:
@@ -475,6 +790,11 @@ def _split_db_url_password(url: str) -> tuple[str, Optional[str]]:
     return url, None
 
 
+# URLs that already carry an accepted sslmode are returned as-is without parsing
+_SSLMODE_OK_RE = re.compile(r"[?&]sslmode=(?:require|prefer|allow)(?:&|#|$)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=8)
 def _ensure_sslmode_in_url(db_url: str) -> str:
     """Ensure SSL mode is set to 'require' for non-local databases.
     
@@ -484,6 +804,8 @@ def _ensure_sslmode_in_url(db_url: str) -> str:
     If the URL already has a stricter mode (verify-ca, verify-full), it will be
     changed to 'require' to avoid certificate verification failures.
     """
+    if _SSLMODE_OK_RE.search(db_url):
+        return db_url
     try:
         u = urlparse(db_url)
         host = (u.hostname or '').lower()
@@ -503,9 +825,44 @@ def _ensure_sslmode_in_url(db_url: str) -> str:
     return db_url
 
 
+@functools.lru_cache(maxsize=8)
+def _with_sslmode(url: str, mode: str) -> str:
+    """Return ``url`` with its sslmode query parameter set to ``mode``."""
+    try:
+        u = urlparse(url)
+        q = dict(parse_qsl(u.query, keep_blank_values=True))
+        q["sslmode"] = mode
+        new_query = urlencode(q)
+        return urlunparse((u.scheme, u.netloc, u.path, u.params, new_query, u.fragment))
+    except Exception:
+        return url
+
+
+# The database URL is derived from env vars that do not change at runtime
+_DB_URL_ENV_NAMES = ("DATABASE_URL", "POSTGRES_URL", "POSTGRES_PRISMA_URL", "SUPABASE_DB_URL")
+_DB_URL_CACHE: Optional[str] = None
+_DB_URL_LOCK = threading.Lock()
+
+
 def _build_database_url() -> str:
+    global _DB_URL_CACHE
+    if _DB_URL_CACHE is None:
+        with _DB_URL_LOCK:
+            if _DB_URL_CACHE is None:
+                _DB_URL_CACHE = _build_database_url_uncached()
+    return _DB_URL_CACHE
+
+
+def _reset_db_url_cache() -> None:
+    """Forget the cached database URL, e.g. after the environment was reloaded."""
+    global _DB_URL_CACHE
+    with _DB_URL_LOCK:
+        _DB_URL_CACHE = None
+
+
+def _build_database_url_uncached() -> str:
     # 1) Direct URL envs
-    for name in ("DATABASE_URL", "POSTGRES_URL", "POSTGRES_PRISMA_URL", "SUPABASE_DB_URL"):
+    for name in _DB_URL_ENV_NAMES:
         val = _get_env_var(name)
         if val:
             return _ensure_sslmode_in_url(val)
@@ -517,7 +874,6 @@ def _build_database_url() -> str:
     port = _get_env_var("PGPORT") or _get_env_var("POSTGRES_PORT") or "5432"
     database = _get_env_var("PGDATABASE") or _get_env_var("POSTGRES_DB") or "postgres"
     if host and user:
-        from urllib.parse import quote
         auth = quote(user)
         if password:
             auth = f"{auth}:{quote(password)}"
@@ -535,7 +891,6 @@ def _build_database_url() -> str:
             user = _get_env_var("SUPABASE_DB_USER") or _get_env_var("PGUSER") or _get_env_var("POSTGRES_USER") or "postgres"
             port = _get_env_var("SUPABASE_DB_PORT") or _get_env_var("PGPORT") or _get_env_var("POSTGRES_PORT") or "5432"
             database = _get_env_var("SUPABASE_DB_NAME") or _get_env_var("PGDATABASE") or _get_env_var("POSTGRES_DB") or "postgres"
-            from urllib.parse import quote
             auth = f"{quote(user)}:{quote(supa_pass)}"
             url = f"postgresql://{auth}@{host}:{port}/{database}"
             return _ensure_sslmode_in_url(url)
@@ -544,54 +899,141 @@ def _build_database_url() -> str:
     return ""
 
 
+@functools.lru_cache(maxsize=1)
 def _psql_available() -> bool:
+    """Probe for the psql client once per process; the host's tooling does not change at runtime."""
+    return shutil.which("psql") is not None
+
+
+# `git remote update --prune` hits the network, so it runs in the background at
+# most once per _FETCH_INTERVAL_SECS and list_branches serves the local refs,
+# unless the caller asks for ?refresh=1 (the manual refresh button).
+_FETCH_INTERVAL_SECS = 30.0
+_FETCH_TIMEOUT_SECS = 20
+_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="git-fetch")
+_FETCH_LOCK = threading.Lock()
+_FETCH_LAST: Optional[float] = None
+_FETCH_FAILED_WARNING = "Could not sync with remote - showing cached branches"
+
+
+def _run_remote_update(git_argv: list) -> bool:
+    """Run the fetch; the caller must hold _FETCH_LOCK, which is released here."""
+    global _FETCH_LAST
     try:
-        subprocess.run(["psql", "--version"], check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
-        return True
+        res = subprocess.run(git_argv + ["remote", "update", "--prune"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=_FETCH_TIMEOUT_SECS)
+        return res.returncode == 0
     except Exception:
         return False
+    finally:
+        _FETCH_LAST = time.monotonic()
+        _FETCH_LOCK.release()
+
+
+def _remote_update_now(git_argv: list) -> Optional[str]:
+    """Fetch before answering; returns a warning when the remote could not be reached.
+
+    A fetch already in flight is waited on instead of being run a second time.
+    """
+    started = time.monotonic()
+    if not _FETCH_LOCK.acquire(timeout=_FETCH_TIMEOUT_SECS):
+        return _FETCH_FAILED_WARNING
+    if _FETCH_LAST is not None and _FETCH_LAST >= started:
+        _FETCH_LOCK.release()
+        return None
+    return None if _run_remote_update(git_argv) else _FETCH_FAILED_WARNING
+
+
+def _schedule_remote_update(git_argv: list) -> None:
+    """Start a background fetch unless one is running or the last one is recent."""
+    if _FETCH_LAST is not None and time.monotonic() - _FETCH_LAST < _FETCH_INTERVAL_SECS:
+        return
+    if not _FETCH_LOCK.acquire(blocking=False):
+        return
+    try:
+        _FETCH_EXECUTOR.submit(_run_remote_update, git_argv)
+    except Exception:
+        _FETCH_LOCK.release()
+        raise
+
+
+# Contents of <repo>/TIME, re-read only when its mtime changes
+_TIME_CACHE = {"path": None, "mtime": None, "value": None}
+# TIME holds a single timestamp line; never read more than this
+_TIME_FILE_MAX_BYTES = 256
+
+
+def _read_last_update_time(repo_root: str) -> Optional[str]:
+    time_path = os.path.join(repo_root, "TIME")
+    try:
+        mtime = os.stat(time_path).st_mtime_ns
+        if _TIME_CACHE["path"] == time_path and _TIME_CACHE["mtime"] == mtime:
+            return _TIME_CACHE["value"]
+        with open(time_path, "rb") as f:
+            data = f.read(_TIME_FILE_MAX_BYTES)
+        value = data.decode("utf-8", errors="replace").strip() or None
+    except Exception:
+        # TIME file doesn't exist or can't be read, which is fine
+        return None
+    _TIME_CACHE.update(path=time_path, mtime=mtime, value=value)
+    return value
+
+
+def _for_each_ref_branches(git_argv: list) -> tuple[list, list, str]:
+    """(origin branches, local branches, current branch) from a single git call."""
+    # %(HEAD) is "*" for the current branch; detached HEAD leaves none marked.
+    res = subprocess.run(git_argv + ["for-each-ref", "--format=%(HEAD)%(refname)", "refs/remotes/origin", "refs/heads"], capture_output=True, text=True, timeout=30, check=False)
+    branches = []
+    local_branches = []
+    current = ""
+    for raw in (res.stdout or "").split("\n"):
+        if len(raw) < 2:
+            continue
+        marker, ref = raw[0], raw[1:].strip()
+        if ref.startswith("refs/remotes/origin/"):
+            name = ref[len("refs/remotes/origin/"):]
+            # Filter out the symbolic HEAD pointer of the remote
+            if name and name != "HEAD":
+                branches.append(name)
+        elif ref.startswith("refs/heads/"):
+            name = ref[len("refs/heads/"):]
+            local_branches.append(name)
+            if marker == "*":
+                current = name
+    if res.returncode == 0 and not current:
+        current = "HEAD"
+    return branches, local_branches, current
 
 
 @app.get("/admin/branches")
 def list_branches():
     _verify_request()
     repo_root = _get_repo_root()
-    git_base = f'git -c "safe.directory={repo_root}" -C "{repo_root}"'
+    git_argv = ["git", "-c", f"safe.directory={repo_root}", "-C", repo_root]
     try:
-        # Prune remotes and fetch new branches - this is the key operation for refreshing
-        subprocess.run(shlex.split(f"{git_base} remote update --prune"), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
-        # List remote branches
-        res = subprocess.run(shlex.split(f"{git_base} for-each-ref --format='%(refname:short)' refs/remotes/origin"), capture_output=True, text=True, timeout=30, check=False)
-        # Normalize remote ref names and exclude non-branch entries
-        branches = []
-        for raw in (res.stdout or "").split("\n"):
-            s = (raw or "").strip()
-            if not s or "->" in s:
-                continue
-            name = s.replace("origin/", "")
-            # Filter out HEAD pointer and the remote namespace itself ("origin")
-            if name in ("HEAD", "origin"):
-                continue
-            branches.append(name)
+        warning = None
+        if str(request.args.get("refresh") or "").lower() in ("1", "true"):
+            warning = _remote_update_now(git_argv)
+        else:
+            # Prune remotes and fetch new branches in the background; this response
+            # reflects the refs from the last completed fetch
+            _schedule_remote_update(git_argv)
+        branches, local_branches, current = _for_each_ref_branches(git_argv)
         if not branches:
             # fallback to local
-            res_local = subprocess.run(shlex.split(f"{git_base} for-each-ref --format='%(refname:short)' refs/heads"), capture_output=True, text=True, timeout=30, check=False)
-            branches = [s.strip() for s in (res_local.stdout or "").split("\n") if s.strip()]
-        cur = subprocess.run(shlex.split(f"{git_base} rev-parse --abbrev-ref HEAD"), capture_output=True, text=True, timeout=10, check=False)
-        current = (cur.stdout or "").strip()
-        branches = sorted(set(branches))
+            branches = local_branches
+        # for-each-ref already returns unique names sorted by refname
         
         # Read the last update time from TIME file if it exists
-        last_update_time = None
-        try:
-            time_file = Path(repo_root) / "TIME"
-            if time_file.exists():
-                last_update_time = time_file.read_text(encoding="utf-8").strip() or None
-        except Exception:
-            # TIME file doesn't exist or can't be read, which is fine
-            pass
+        last_update_time = _read_last_update_time(repo_root)
         
-        response = jsonify({"branches": branches, "current": current, "lastUpdateTime": last_update_time})
+        payload = {
+            "branches": branches,
+            "current": current,
+            "lastUpdateTime": last_update_time,
+        }
+        if warning:
+            payload["warning"] = warning
+        response = jsonify(payload)
         # Prevent browser caching to ensure fresh branch data on refresh
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
@@ -601,19 +1043,103 @@ def list_branches():
         return jsonify({"error": str(e) or "Failed to list branches"}), 500
 
 
+# One anchored pattern for every rule: safe ASCII characters only, at most 255
+# of them, no leading "-" (option injection), no ".." and no "//"
+_BRANCH_NAME_RE = re.compile(r"\A(?!-)(?!.*\.\.)(?!.*//)[a-zA-Z0-9_./-]{1,255}\Z")
+
+
 def _validate_branch_name(name: str) -> bool:
     if not name:
         return True
-    if name.startswith("-"):
-        return False
-    if ".." in name:
-        return False
-    if "//" in name:
-        return False
-    # Only allow safe characters
-    if not re.match(r"^[a-zA-Z0-9_./-]+$", name):
-        return False
-    return True
+    return _BRANCH_NAME_RE.match(name) is not None
+
+
+# Output of long-running scripts is forwarded as SSE in batches: up to
+# _SSE_BATCH_LINES lines per frame, flushed at least every _SSE_BATCH_SECS.
+_SSE_BATCH_LINES = 32
+_SSE_BATCH_SECS = 0.016
+_SSE_MAX_LINE = 4000
+# A silent script (long npm install, build step) gets an SSE comment this often,
+# so nginx and the browser do not time the stream out
+_SSE_KEEPALIVE_SECS = 15.0
+
+
+_SSE_DATA = b"data: "
+_SSE_DATA_SEP = b"\ndata: "
+_SSE_END = b"\n\n"
+_SSE_KEEPALIVE = b": keepalive\n\n"
+_SSE_DONE_OK = b'event: done\ndata: {"ok": true}\n\n'
+# Filled in with the script's exit code by bytes %-formatting
+_SSE_DONE_FAILED = b'event: done\ndata: {"ok": false, "code": %d}\n\n'
+_SSE_ELLIPSIS = "…".encode("utf-8")
+# sudo password prompts and echoes, matched on the raw output bytes
+_SUDO_PROMPT_RE = re.compile(rb"\[sudo\]|password", re.IGNORECASE)
+
+
+def _iter_sse_output(p: subprocess.Popen, skip_line: Optional[Callable[[bytes], bool]] = None):
+    """Yield SSE data frames (as bytes) for a process started with a binary stdout pipe.
+
+    Lines for which ``skip_line`` returns True are not forwarded; it is given
+    the raw line bytes, before any decoding.
+    """
+    assert p.stdout is not None
+    fd = p.stdout.fileno()
+    pending = b""
+    batch: list[bytes] = []
+    last_flush = time.monotonic()
+
+    def add_line(raw: bytes) -> None:
+        raw = raw.rstrip(b"\r")
+        if not raw:
+            return
+        if skip_line is not None and skip_line(raw):
+            return
+        if raw.isascii():
+            # Common case: ASCII is already valid UTF-8 and one byte per character,
+            # so it passes through as is and truncates with a plain slice
+            batch.append(raw if len(raw) <= _SSE_MAX_LINE else raw[:_SSE_MAX_LINE] + _SSE_ELLIPSIS)
+            return
+        txt = raw.decode("utf-8", errors="replace")
+        # Basic safety: truncate very long lines
+        if len(txt) > _SSE_MAX_LINE:
+            txt = txt[:_SSE_MAX_LINE] + "…"
+        batch.append(txt.encode("utf-8"))
+
+    while True:
+        ready, _, _ = select.select([fd], [], [], _SSE_BATCH_SECS if batch else _SSE_KEEPALIVE_SECS)
+        if not ready and not batch:
+            yield _SSE_KEEPALIVE
+            continue
+        if ready:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            *lines, pending = (pending + chunk).split(b"\n")
+            for raw in lines:
+                add_line(raw)
+        if batch and (not ready or len(batch) >= _SSE_BATCH_LINES or time.monotonic() - last_flush >= _SSE_BATCH_SECS):
+            yield _SSE_DATA + _SSE_DATA_SEP.join(batch) + _SSE_END
+            batch.clear()
+            last_flush = time.monotonic()
+    if pending:
+        add_line(pending)
+    if batch:
+        yield _SSE_DATA + _SSE_DATA_SEP.join(batch) + _SSE_END
+
+
+def _sse_error_frame(e: Exception) -> bytes:
+    """An ``error`` event carrying the exception message, one data line per message line."""
+    lines = (str(e) or type(e).__name__).splitlines() or [""]
+    return b"event: error\n" + _SSE_DATA + _SSE_DATA_SEP.join(l.encode("utf-8") for l in lines) + _SSE_END
+
+
+# Every frame is already bytes, so Werkzeug's per-chunk encoding is skipped;
+# X-Accel-Buffering stops nginx from holding frames back
+_SSE_HEADERS = {"X-Accel-Buffering": "no", "Cache-Control": "no-cache"}
+
+
+def _sse_response(frames) -> Response:
+    return Response(frames, mimetype="text/event-stream", direct_passthrough=True, headers=_SSE_HEADERS)
 
 
 def _run_refresh(branch: Optional[str], stream: bool):
@@ -633,7 +1159,7 @@ def _run_refresh(branch: Optional[str], stream: bool):
     if stream:
         # Stream stdout/stderr as SSE
         def generate():
-            yield "event: open\n" "data: {\"ok\": true, \"message\": \"Starting refresh?\"}\n\n"
+            yield b"event: open\ndata: {\"ok\": true, \"message\": \"Starting refresh?\"}\n\n"
             try:
                 p = subprocess.Popen(
                     [script_path],
@@ -641,35 +1167,27 @@ def _run_refresh(branch: Optional[str], stream: bool):
                     env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    bufsize=1,
-                    universal_newlines=True,
+                    bufsize=0,
                 )
             except Exception as e:
-                yield f"event: error\ndata: {str(e)}\n\n"
+                yield _sse_error_frame(e)
                 return
             if branch:
-                yield f"data: [pull] Target branch requested: {branch}\n\n"
+                yield f"data: [pull] Target branch requested: {branch}\n\n".encode("utf-8")
             try:
-                assert p.stdout is not None
-                for line in p.stdout:
-                    txt = line.rstrip("\n\r")
-                    if not txt:
-                        continue
-                    # Basic safety: truncate very long lines
-                    if len(txt) > 4000:
-                        txt = txt[:4000] + "?"
-                    yield f"data: {txt}\n\n"
+                yield from _iter_sse_output(p)
             finally:
                 code = p.wait()
                 if code == 0:
-                    yield "event: done\n" "data: {\"ok\": true}\n\n"
+                    yield _SSE_DONE_OK
                 else:
-                    yield f"event: done\ndata: {{\"ok\": false, \"code\": {code} }}\n\n"
-        return Response(generate(), mimetype="text/event-stream")
+                    yield _SSE_DONE_FAILED % code
+        return _sse_response(generate())
     else:
-        # Fire-and-forget
+        # Fire-and-forget: in its own session, so signals aimed at the worker's
+        # process group (reload, Ctrl-C in dev) do not cut the refresh short
         try:
-            subprocess.Popen([script_path], cwd=repo_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            subprocess.Popen([script_path], cwd=repo_root, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
             return jsonify({"ok": True, "started": True, "branch": branch or None})
         except Exception as e:
             return jsonify({"ok": False, "error": str(e) or "failed to start"}), 500
@@ -683,10 +1201,7 @@ def admin_refresh_stream():
     if branch and not _validate_branch_name(branch):
         return jsonify({"ok": False, "error": "Invalid branch name"}), 400
 
-    try:
-        _log_admin_action("pull_code", branch or "")
-    except Exception:
-        pass
+    _log_admin_action("pull_code", branch or "")
     return _run_refresh(branch, stream=True)
 
 
@@ -694,16 +1209,13 @@ def admin_refresh_stream():
 @app.post("/admin/pull-code")
 def admin_refresh():
     _verify_request()
-    body = request.get_json(silent=True) or {}
+    body = _json_body()
     branch = (request.args.get("branch") or body.get("branch") or "").strip() or None
 
     if branch and not _validate_branch_name(branch):
         return jsonify({"ok": False, "error": "Invalid branch name"}), 400
 
-    try:
-        _log_admin_action("pull_code", branch or "")
-    except Exception:
-        pass
+    _log_admin_action("pull_code", branch or "")
     return _run_refresh(branch, stream=False)
 
 
@@ -718,7 +1230,7 @@ def _run_aphydle_refresh(stream: bool):
     env["PLANTSWIPE_REPO_DIR"] = repo_root
     if stream:
         def generate():
-            yield "event: open\ndata: {\"ok\": true, \"message\": \"Starting Aphydle refresh...\"}\n\n"
+            yield b"event: open\ndata: {\"ok\": true, \"message\": \"Starting Aphydle refresh...\"}\n\n"
             try:
                 p = subprocess.Popen(
                     [script_path],
@@ -726,31 +1238,24 @@ def _run_aphydle_refresh(stream: bool):
                     env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    bufsize=1,
-                    universal_newlines=True,
+                    bufsize=0,
                 )
             except Exception as e:
-                yield f"event: error\ndata: {str(e)}\n\n"
+                yield _sse_error_frame(e)
                 return
             try:
-                assert p.stdout is not None
-                for line in p.stdout:
-                    txt = line.rstrip("\n\r")
-                    if not txt:
-                        continue
-                    if len(txt) > 4000:
-                        txt = txt[:4000] + "..."
-                    yield f"data: {txt}\n\n"
+                yield from _iter_sse_output(p)
             finally:
                 code = p.wait()
                 if code == 0:
-                    yield "event: done\ndata: {\"ok\": true}\n\n"
+                    yield _SSE_DONE_OK
                 else:
-                    yield f"event: done\ndata: {{\"ok\": false, \"code\": {code} }}\n\n"
-        return Response(generate(), mimetype="text/event-stream")
+                    yield _SSE_DONE_FAILED % code
+        return _sse_response(generate())
     else:
+        # Fire-and-forget, detached like _run_refresh so worker signals cannot cut it short
         try:
-            subprocess.Popen([script_path], cwd=repo_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            subprocess.Popen([script_path], cwd=repo_root, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
             return jsonify({"ok": True, "started": True})
         except Exception as e:
             return jsonify({"ok": False, "error": str(e) or "failed to start"}), 500
@@ -759,10 +1264,7 @@ def _run_aphydle_refresh(stream: bool):
 @app.get("/admin/refresh-aphydle/stream")
 def admin_refresh_aphydle_stream():
     _verify_request()
-    try:
-        _log_admin_action("refresh_aphydle", "stream")
-    except Exception:
-        pass
+    _log_admin_action("refresh_aphydle", "stream")
     return _run_aphydle_refresh(stream=True)
 
 
@@ -770,10 +1272,7 @@ def admin_refresh_aphydle_stream():
 @app.post("/admin/refresh-aphydle")
 def admin_refresh_aphydle():
     _verify_request()
-    try:
-        _log_admin_action("refresh_aphydle", "")
-    except Exception:
-        pass
+    _log_admin_action("refresh_aphydle", "")
     return _run_aphydle_refresh(stream=False)
 
 
@@ -785,10 +1284,7 @@ def admin_deploy_edge_functions():
     script_path = _supabase_script_path(repo_root)
     if not os.path.isfile(script_path):
         detail = {"error": "deploy script not found", "path": script_path}
-        try:
-            _log_admin_action("deploy_edge_functions_failed", detail=detail)
-        except Exception:
-            pass
+        _log_admin_action("deploy_edge_functions_failed", detail=detail)
         return jsonify({"ok": False, "error": f"deploy script not found at {script_path}"}), 500
 
     _ensure_executable(script_path)
@@ -807,16 +1303,10 @@ def admin_deploy_edge_functions():
             check=False,
         )
     except subprocess.TimeoutExpired:
-        try:
-            _log_admin_action("deploy_edge_functions_failed", detail={"error": "timeout"})
-        except Exception:
-            pass
+        _log_admin_action("deploy_edge_functions_failed", detail={"error": "timeout"})
         return jsonify({"ok": False, "error": "Supabase deployment timed out"}), 504
     except Exception as e:
-        try:
-            _log_admin_action("deploy_edge_functions_failed", detail={"error": str(e) or "unexpected failure"})
-        except Exception:
-            pass
+        _log_admin_action("deploy_edge_functions_failed", detail={"error": str(e) or "unexpected failure"})
         return jsonify({"ok": False, "error": str(e) or "Failed to run deploy script"}), 500
 
     stdout = res.stdout or ""
@@ -829,10 +1319,7 @@ def admin_deploy_edge_functions():
         "stderrTail": stderr_tail or None,
     }
     if res.returncode != 0:
-        try:
-            _log_admin_action("deploy_edge_functions_failed", detail=detail)
-        except Exception:
-            pass
+        _log_admin_action("deploy_edge_functions_failed", detail=detail)
         return jsonify({
             "ok": False,
             "error": "Supabase deployment failed",
@@ -841,10 +1328,7 @@ def admin_deploy_edge_functions():
             "stderr": stderr_tail,
         }), 500
 
-    try:
-        _log_admin_action("deploy_edge_functions", detail=detail)
-    except Exception:
-        pass
+    _log_admin_action("deploy_edge_functions", detail=detail)
     return jsonify({
         "ok": True,
         "message": "Supabase Edge Functions deployed successfully",
@@ -855,9 +1339,14 @@ def admin_deploy_edge_functions():
 
 
 
+# Polled by load balancers and uptime checks, so the body is built once. Each call
+# still gets its own Response since Flask may set headers on the returned object.
+_HEALTH_BODY = b'{"ok":true}'
+
+
 @app.get("/health")
 def health():
-    return jsonify({"ok": True})
+    return Response(_HEALTH_BODY, mimetype="application/json")
 
 
 # =============================================================================
@@ -868,10 +1357,12 @@ def health():
 def get_maintenance_mode():
     """Get current maintenance mode status."""
     _verify_request()
-    status = _get_maintenance_mode()
+    # Always stat here so changes made by other processes show up immediately;
+    # the parsed file is still reused while its mtime is unchanged
+    status = _get_maintenance_mode(max_age=0)
     remaining_ms = 0
     if status.get("active") and status.get("expiresAt"):
-        remaining_ms = max(0, int(status["expiresAt"] - time.time() * 1000))
+        remaining_ms = max(0, int(status["expiresAt"]) - time.time_ns() // 1_000_000)
     return jsonify({
         "ok": True,
         **status,
@@ -883,7 +1374,7 @@ def get_maintenance_mode():
 def enable_maintenance_mode():
     """Enable maintenance mode (suppresses 502/503/504 errors in Sentry)."""
     _verify_request()
-    payload = request.get_json(silent=True) or {}
+    payload = _json_body()
     # Duration in milliseconds (default: 5 minutes, max: 30 minutes)
     duration_ms = min(
         max(int(payload.get("durationMs", 300000)), 60000),  # At least 1 minute
@@ -892,19 +1383,17 @@ def enable_maintenance_mode():
     reason = str(payload.get("reason", "admin-request"))[:100]
     
     try:
+        now_ms = time.time_ns() // 1_000_000
         data = {
             "active": True,
-            "enabledAt": int(time.time() * 1000),
-            "expiresAt": int(time.time() * 1000 + duration_ms),
+            "enabledAt": now_ms,
+            "expiresAt": now_ms + duration_ms,
             "reason": reason,
         }
-        with open(MAINTENANCE_MODE_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        _atomic_write_bytes(MAINTENANCE_MODE_FILE, _json_dumps_bytes(data))
+        _invalidate_maintenance_cache()
         print(f"[Sentry] Maintenance mode ENABLED - suppressing expected errors for {duration_ms / 1000}s (reason: {reason})")
-        try:
-            _log_admin_action("maintenance_mode_enable", reason, detail={"durationMs": duration_ms})
-        except Exception:
-            pass
+        _log_admin_action("maintenance_mode_enable", reason, detail={"durationMs": duration_ms})
         return jsonify({
             "ok": True,
             "message": f"Maintenance mode enabled for {duration_ms / 1000} seconds",
@@ -922,11 +1411,9 @@ def disable_maintenance_mode():
     try:
         if os.path.exists(MAINTENANCE_MODE_FILE):
             os.unlink(MAINTENANCE_MODE_FILE)
+        _invalidate_maintenance_cache()
         print("[Sentry] Maintenance mode DISABLED - normal error reporting resumed")
-        try:
-            _log_admin_action("maintenance_mode_disable")
-        except Exception:
-            pass
+        _log_admin_action("maintenance_mode_disable")
         return jsonify({
             "ok": True,
             "message": "Maintenance mode disabled"
@@ -938,15 +1425,12 @@ def disable_maintenance_mode():
 @app.post("/admin/restart-app")
 def restart_app():
     _verify_request()
-    payload = request.get_json(silent=True) or {}
+    payload = _json_body()
     service = str(payload.get("service") or DEFAULT_SERVICE).strip()
     if not service:
         abort(400, description="missing service")
     _restart_service(service)
-    try:
-        _log_admin_action("restart_service", service)
-    except Exception:
-        pass
+    _log_admin_action("restart_service", service)
     return jsonify({"ok": True, "action": "restart", "service": service})
 
 
@@ -954,10 +1438,7 @@ def restart_app():
 def reload_nginx():
     _verify_request()
     _reload_nginx()
-    try:
-        _log_admin_action("reload_nginx", "nginx")
-    except Exception:
-        pass
+    _log_admin_action("reload_nginx", "nginx")
     return jsonify({"ok": True, "action": "reload", "service": "nginx"})
 
 
@@ -966,13 +1447,245 @@ def reboot():
     _verify_request()
     _reboot_machine()
     # If reboot succeeds, client may never see this response
-    try:
-        _log_admin_action("reboot", "server")
-    except Exception:
-        pass
+    _log_admin_action("reboot", "server")
     return jsonify({"ok": True, "action": "reboot"})
 
 
+# All sync_parts files run in a single psql session. Before each file (and once
+# at the end) psql prints a marker row with the server clock, which lets us
+# split the combined output per file and time each one.
+_SQL_BATCH_MARKER = ">>>SYNC_PART:"
+# psql prefixes messages raised while running `-f <path>` with "psql:<path>:<line>: "
+_PSQL_LOCATION_RE = re.compile(r"psql:(.+?):\d+: ")
+_PSQL_ERROR_RE = re.compile(r"ERROR:", re.IGNORECASE)
+_PSQL_WARNING_RE = re.compile(r"WARNING:|NOTICE:", re.IGNORECASE)
+# psql stderr is spooled to a temp file and only this many trailing lines are
+# read back. ON_ERROR_STOP makes the failing statement the last thing reported,
+# so NOTICE floods from big files cannot push errors out of the kept tail.
+_PSQL_STDERR_MAX_LINES = 2000
+
+
+def _read_tail_lines(f, max_lines: int = _PSQL_STDERR_MAX_LINES) -> str:
+    """Decode the last ``max_lines`` lines of binary file ``f``."""
+    f.seek(0)
+    return b"".join(deque(f, maxlen=max_lines)).decode("utf-8", errors="replace")
+
+
+# Query output of the sync files is only echoed as per-file detail, so at most
+# this many trailing rows are kept between two batch markers.
+_PSQL_STDOUT_MAX_LINES_PER_PART = 200
+
+
+def _read_batch_stdout(f, max_lines: int = _PSQL_STDOUT_MAX_LINES_PER_PART) -> str:
+    """Decode spooled psql stdout, keeping every batch marker and the tail of each part."""
+    f.seek(0)
+    marker = _SQL_BATCH_MARKER.encode("utf-8")
+    kept: list = []
+    part: deque = deque(maxlen=max_lines)
+    for line in f:
+        if line.startswith(marker):
+            kept.extend(part)
+            part.clear()
+            kept.append(line)
+        else:
+            part.append(line)
+    kept.extend(part)
+    return b"".join(kept).decode("utf-8", errors="replace")
+
+
+def _sql_batch_marker_cmd(label: str) -> str:
+    return f"SELECT '{_SQL_BATCH_MARKER}{label}', (extract(epoch from clock_timestamp()) * 1000)::bigint"
+
+
+def _build_sql_batch_cmd(db_url: str, sql_paths: list, trailing_stdin: bool = False) -> list:
+    """Build one psql invocation that runs every file in order with markers between them.
+
+    With trailing_stdin, a script read from stdin runs after the last file, in
+    the same session, so post-sync statements need no second connection.
+    """
+    cmd = [
+        "psql",
+        db_url,
+        "-v", "ON_ERROR_STOP=1",
+        "-X",
+        "-q",  # Quiet mode for cleaner output
+        "-A", "-t",  # Unaligned tuples so marker rows are easy to parse
+    ]
+    for i, sql_path in enumerate(sql_paths):
+        cmd += ["-c", _sql_batch_marker_cmd(str(i)), "-f", sql_path]
+    if trailing_stdin:
+        cmd += ["-c", _sql_batch_marker_cmd("stdin"), "-f", "-"]
+    cmd += ["-c", _sql_batch_marker_cmd("end")]
+    return cmd
+
+
+# CA bundle fetched from curl.se for the psql SSL fallback; kept for the process
+# lifetime so repeated syncs don't re-download it
+_CA_BUNDLE_URL = "https://curl.se/ca/cacert.pem"
+_CA_BUNDLE_PATH: Optional[str] = None
+_CA_BUNDLE_LOCK = threading.Lock()
+
+_SYSTEM_CA_PATHS = (
+    "/etc/ssl/certs/ca-certificates.crt",  # Debian/Ubuntu
+    "/etc/pki/tls/certs/ca-bundle.crt",    # RHEL/CentOS
+    "/etc/ssl/ca-bundle.pem",               # OpenSUSE
+    "/etc/ssl/cert.pem",                    # Alpine/macOS
+    "/usr/local/share/ca-certificates/cacert.pem",  # Custom location
+)
+
+
+def _remove_ca_bundle() -> None:
+    if _CA_BUNDLE_PATH:
+        try:
+            os.unlink(_CA_BUNDLE_PATH)
+        except OSError:
+            pass
+
+
+atexit.register(_remove_ca_bundle)
+
+
+def _downloaded_ca_bundle() -> Optional[str]:
+    """Path to the curl.se CA bundle, downloading it on first use (or if it was removed)."""
+    global _CA_BUNDLE_PATH
+    with _CA_BUNDLE_LOCK:
+        if _CA_BUNDLE_PATH and os.path.isfile(_CA_BUNDLE_PATH):
+            return _CA_BUNDLE_PATH
+        try:
+            req = urllib.request.Request(_CA_BUNDLE_URL, headers={'User-Agent': 'Mozilla/5.0'})
+            with urllib.request.urlopen(req, timeout=10) as response:
+                ca_content = response.read()
+            with tempfile.NamedTemporaryFile(mode='wb', suffix='.pem', delete=False) as ca_temp_file:
+                ca_temp_file.write(ca_content)
+        except Exception:
+            return None
+        _CA_BUNDLE_PATH = ca_temp_file.name
+        return _CA_BUNDLE_PATH
+
+
+@functools.lru_cache(maxsize=1)
+def _system_ca_bundles() -> tuple:
+    """System CA bundle paths present on this host (checked once per process)."""
+    return tuple(p for p in _SYSTEM_CA_PATHS if os.path.isfile(p))
+
+
+def _admin_secrets_sql() -> Optional[str]:
+    """SQL that mirrors the Supabase URL and service key into public.admin_secrets, if configured.
+
+    The values never appear in the SQL text: psql reads them from its own
+    environment (inherited from ours) into variables, and :'var' interpolation
+    quotes them as literals.
+    """
+    url_var = next((k for k in ("SUPABASE_URL", "VITE_SUPABASE_URL") if os.environ.get(k)), None)
+    if not (url_var and os.environ.get("SUPABASE_SERVICE_ROLE_KEY")):
+        return None
+    return f"""
+\\set supabase_url `printf '%s' "${url_var}"`
+\\set service_role_key `printf '%s' "$SUPABASE_SERVICE_ROLE_KEY"`
+INSERT INTO public.admin_secrets (key, value)
+VALUES ('SUPABASE_URL', :'supabase_url'), ('SUPABASE_SERVICE_ROLE_KEY', :'service_role_key')
+ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now();
+"""
+
+
+def _parse_sql_batch_output(sql_files: list, sql_paths: list, out: str, err: str, returncode: int,
+                            elapsed_ms: int, forced_error: Optional[str] = None) -> tuple[list, list, Optional[str]]:
+    """Split batched psql output into per-file results and warnings.
+
+    Files after the one that failed were never executed and are reported as "skipped".
+    The third return value is the error of the trailing stdin script, if it failed.
+    """
+    n = len(sql_files)
+    started: dict[int, Optional[int]] = {}
+    end_ts: Optional[int] = None
+    # One bucket per file, plus a last one for the trailing stdin script
+    file_lines: list[list[str]] = [[] for _ in range(n + 1)]
+    stdin_started = False
+    stdin_ts: Optional[int] = None
+
+    current = None
+    for line in out.splitlines():
+        if line.startswith(_SQL_BATCH_MARKER):
+            label, _, ts = line[len(_SQL_BATCH_MARKER):].partition("|")
+            ts_val = int(ts) if ts.strip().isdigit() else None
+            if label == "end":
+                end_ts = ts_val
+                current = None
+            elif label == "stdin":
+                stdin_started = True
+                stdin_ts = ts_val
+                current = n
+            elif label.isdigit() and int(label) < n:
+                current = int(label)
+                started[current] = ts_val
+            continue
+        if current is not None:
+            file_lines[current].append(line)
+
+    path_index = {path: i for i, path in enumerate(sql_paths)}
+    path_index["<stdin>"] = n
+    unattributed: list[str] = []
+    current = None
+    for line in err.splitlines():
+        m = _PSQL_LOCATION_RE.match(line)
+        if m and m.group(1) in path_index:
+            current = path_index[m.group(1)]
+        # Continuation lines (DETAIL, HINT, CONTEXT...) belong to the last located message
+        if current is None:
+            unattributed.append(line)
+        else:
+            file_lines[current].append(line)
+
+    failed_index = None
+    stdin_error = None
+    if returncode != 0 or forced_error:
+        if stdin_started:
+            stdin_error = "\n".join(file_lines[n] + unattributed).strip() or forced_error or f"psql exited with code {returncode}"
+        else:
+            failed_index = max(started) if started else 0
+            file_lines[failed_index].extend(unattributed)
+
+    def next_ts(i: int) -> Optional[int]:
+        if i + 1 in started:
+            return started[i + 1]
+        if i != n - 1:
+            return None
+        return stdin_ts if stdin_started else end_ts
+
+    durations: dict[int, Optional[int]] = {}
+    for i in range(n):
+        start, finish = started.get(i), next_ts(i)
+        durations[i] = finish - start if start is not None and finish is not None else None
+    if failed_index is not None:
+        known = sum(d for i, d in durations.items() if d is not None and i < failed_index)
+        durations[failed_index] = max(0, elapsed_ms - known)
+
+    results = []
+    warnings = []
+    for i, sql_file in enumerate(sql_files):
+        duration = "n/a" if durations[i] is None else f"{durations[i]}ms"
+        if failed_index is not None and i > failed_index:
+            results.append({"file": sql_file, "status": "skipped", "duration": "0ms"})
+            continue
+        lines = file_lines[i]
+        error_lines = [l for l in lines if _PSQL_ERROR_RE.search(l)]
+        if i == failed_index or error_lines:
+            error_msg = "\n".join(lines).strip() or (forced_error or "")
+            error_summary = forced_error or (error_lines[0] if error_lines else error_msg[:200]) or f"psql exited with code {returncode}"
+            results.append({
+                "file": sql_file,
+                "status": "error",
+                "duration": duration,
+                "error": error_summary,
+                "detail": error_msg[:500] if len(error_msg) > 500 else error_msg
+            })
+            continue
+        results.append({"file": sql_file, "status": "success", "duration": duration})
+        # Collect warnings
+        warnings.extend(f"[{sql_file}] {line}" for line in lines if _PSQL_WARNING_RE.search(line))
+    return results, warnings, stdin_error
+
+
 @app.get("/admin/sync-schema")
 @app.post("/admin/sync-schema")
 def sync_schema():
@@ -982,10 +1695,7 @@ def sync_schema():
     sql_files = _get_sql_files_in_order(sync_parts_dir)
     
     if not sql_files:
-        try:
-            _log_admin_action("sync_schema_failed", detail={"error": "sync_parts folder not found or empty", "path": sync_parts_dir})
-        except Exception:
-            pass
+        _log_admin_action("sync_schema_failed", detail={"error": "sync_parts folder not found or empty", "path": sync_parts_dir})
         return jsonify({
             "ok": False, 
             "error": f"sync_parts folder not found or empty at {sync_parts_dir}",
@@ -995,23 +1705,17 @@ def sync_schema():
 
     db_url = _build_database_url()
     if not db_url:
-        try:
-            _log_admin_action("sync_schema_failed", detail={"error": "Database not configured"})
-        except Exception:
-            pass
+        _log_admin_action("sync_schema_failed", detail={"error": "Database not configured"})
         return jsonify({"ok": False, "error": "Database not configured"}), 500
 
     if not _psql_available():
-        try:
-            _log_admin_action("sync_schema_failed", detail={"error": "psql not available on server"})
-        except Exception:
-            pass
+        _log_admin_action("sync_schema_failed", detail={"error": "psql not available on server"})
         return jsonify({"ok": False, "error": "psql not available on server"}), 500
 
     # Strip password from DB URL to avoid leaking it in process list
     safe_db_url, db_password = _split_db_url_password(db_url)
 
-    def _run_psql_with_ssl_fallback(cmd_args, db_url, password=None, timeout_secs=180):
+    def _run_psql_with_ssl_fallback(cmd_args, db_url, password=None, timeout_secs=180, input_text=None):
         """Run psql with SSL, with multiple fallback strategies for certificate verification issues.
         
         Tries multiple approaches to work around SSL certificate verification failures:
@@ -1019,222 +1723,112 @@ def sync_schema():
         2. Download fresh CA bundle from curl.se and use it
         3. Use system CA bundle with explicit path
         """
-        from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
-        import tempfile
-        import urllib.request
+        # Environment shared by every attempt: copied and stripped of SSL settings once
+        base_env = {k: v for k, v in os.environ.items() if not (k.startswith("PGSSL") or k.startswith("SSL_"))}
+        base_env["PGSSLMODE"] = "require"
+        # Use PGPASSWORD environment variable instead of passing password in connection string
+        if password:
+            base_env["PGPASSWORD"] = password
         
         def build_psql_env(ca_cert_path=None, use_nonexistent=False):
             """Build environment for psql with SSL settings."""
-            env = os.environ.copy()
-            # Remove any existing SSL settings
-            for key in list(env.keys()):
-                if key.startswith("PGSSL") or key.startswith("SSL_"):
-                    del env[key]
-            
-            env["PGSSLMODE"] = "require"
-            
             if use_nonexistent:
-                env["PGSSLROOTCERT"] = "/nonexistent/.postgresql/root.crt"
-            elif ca_cert_path:
-                env["PGSSLROOTCERT"] = ca_cert_path
-            
-            # Use PGPASSWORD environment variable instead of passing password in connection string
-            if password:
-                env["PGPASSWORD"] = password
-
-            return env
+                return {**base_env, "PGSSLROOTCERT": "/nonexistent/.postgresql/root.crt"}
+            if ca_cert_path:
+                return {**base_env, "PGSSLROOTCERT": ca_cert_path}
+            return base_env
         
-        def modify_url_sslmode(url, mode="require"):
-            """Ensure URL has the specified sslmode."""
-            try:
-                u = urlparse(url)
-                q = dict(parse_qsl(u.query, keep_blank_values=True))
-                q["sslmode"] = mode
-                new_query = urlencode(q)
-                return urlunparse((u.scheme, u.netloc, u.path, u.params, new_query, u.fragment))
-            except Exception:
-                return url
+        def run_psql(psql_env):
+            """Run psql with its output spooled to disk, keeping only bounded tails in memory."""
+            with tempfile.TemporaryFile() as out_file, tempfile.TemporaryFile() as err_file:
+                try:
+                    res = subprocess.run(cmd_modified, input=input_text, stdout=out_file, stderr=err_file, text=True, timeout=timeout_secs, check=False, env=psql_env)
+                except subprocess.TimeoutExpired as ex:
+                    ex.stdout = _read_batch_stdout(out_file)
+                    ex.stderr = _read_tail_lines(err_file)
+                    raise
+                res.stdout = _read_batch_stdout(out_file)
+                res.stderr = _read_tail_lines(err_file)
+                return res
         
         def update_cmd_url(cmd, old_url, new_url):
             """Replace URL in command args."""
             return [new_url if arg == old_url else arg for arg in cmd]
         
         # Modify URL to ensure sslmode=require
-        db_url_modified = modify_url_sslmode(db_url, "require")
+        db_url_modified = _with_sslmode(db_url, "require")
         cmd_modified = update_cmd_url(list(cmd_args), db_url, db_url_modified)
         
         # Strategy 1: Try with non-existent root cert (should skip verification)
         psql_env = build_psql_env(use_nonexistent=True)
-        res = subprocess.run(cmd_modified, capture_output=True, text=True, timeout=timeout_secs, check=False, env=psql_env)
+        res = run_psql(psql_env)
         
         stderr_lower = (res.stderr or "").lower()
         if res.returncode == 0 or "certificate" not in stderr_lower:
             return res
         
-        # Strategy 2: Try downloading fresh CA certificates from curl.se
-        try:
-            ca_bundle_url = "https://curl.se/ca/cacert.pem"
-            ca_temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.pem', delete=False)
-            try:
-                # Download CA bundle with a short timeout
-                req = urllib.request.Request(ca_bundle_url, headers={'User-Agent': 'Mozilla/5.0'})
-                with urllib.request.urlopen(req, timeout=10) as response:
-                    ca_content = response.read().decode('utf-8')
-                    ca_temp_file.write(ca_content)
-                    ca_temp_file.close()
-                
-                # Try with fresh CA bundle
-                psql_env = build_psql_env(ca_cert_path=ca_temp_file.name)
-                res = subprocess.run(cmd_modified, capture_output=True, text=True, timeout=timeout_secs, check=False, env=psql_env)
-                
-                if res.returncode == 0 or "certificate" not in (res.stderr or "").lower():
-                    # Clean up temp file on success
-                    try:
-                        os.unlink(ca_temp_file.name)
-                    except:
-                        pass
-                    return res
-            except Exception as e:
-                pass  # Continue to next strategy
-            finally:
-                try:
-                    os.unlink(ca_temp_file.name)
-                except:
-                    pass
-        except Exception:
-            pass
+        # Strategy 2: Try a fresh CA bundle from curl.se (downloaded once per process)
+        ca_bundle = _downloaded_ca_bundle()
+        if ca_bundle:
+            psql_env = build_psql_env(ca_cert_path=ca_bundle)
+            res = run_psql(psql_env)
+            if res.returncode == 0 or "certificate" not in (res.stderr or "").lower():
+                return res
         
         # Strategy 3: Try with common system CA paths
-        ca_paths = [
-            "/etc/ssl/certs/ca-certificates.crt",  # Debian/Ubuntu
-            "/etc/pki/tls/certs/ca-bundle.crt",    # RHEL/CentOS
-            "/etc/ssl/ca-bundle.pem",               # OpenSUSE
-            "/etc/ssl/cert.pem",                    # Alpine/macOS
-            "/usr/local/share/ca-certificates/cacert.pem",  # Custom location
-        ]
-        
-        for ca_path in ca_paths:
-            if os.path.isfile(ca_path):
-                psql_env = build_psql_env(ca_cert_path=ca_path)
-                res = subprocess.run(cmd_modified, capture_output=True, text=True, timeout=timeout_secs, check=False, env=psql_env)
-                if res.returncode == 0 or "certificate" not in (res.stderr or "").lower():
-                    return res
+        for ca_path in _system_ca_bundles():
+            psql_env = build_psql_env(ca_cert_path=ca_path)
+            res = run_psql(psql_env)
+            if res.returncode == 0 or "certificate" not in (res.stderr or "").lower():
+                return res
         
         # Return last result if all strategies failed
         return res
     
     try:
-        import time
-        
-        # Prepare environment for psql calls
-        psql_env = os.environ.copy()
-        for key in list(psql_env.keys()):
-            if key.startswith("PGSSL"):
-                del psql_env[key]
-        psql_env["PGSSLMODE"] = "require"
-        psql_env["PGSSLROOTCERT"] = "/nonexistent/.postgresql/root.crt"
-        
-        # Execute each SQL file and track results
-        results = []
-        has_any_error = False
-        failed_file = None
-        failed_error = None
-        all_warnings = []
-        
-        for sql_file in sql_files:
-            sql_path = os.path.join(sync_parts_dir, sql_file)
-            start_time = time.time()
-            
-            # Run psql for this file
-            # Use safe_db_url which does not contain the password
-            cmd = [
-                "psql",
-                safe_db_url,
-                "-v", "ON_ERROR_STOP=1",
-                "-X",
-                "-q",  # Quiet mode for cleaner output
-                "-f", sql_path,
-            ]
-            
-            try:
-                # Pass safe_db_url and explicit password
-                res = _run_psql_with_ssl_fallback(cmd, safe_db_url, password=db_password, timeout_secs=60)
-                duration_ms = int((time.time() - start_time) * 1000)
-                
-                out = (res.stdout or "")
-                err = (res.stderr or "")
-                
-                # Check for errors
-                file_has_error = res.returncode != 0 or "ERROR:" in out.upper() or "ERROR:" in err.upper()
-                
-                if file_has_error:
-                    error_msg = err.strip() if err.strip() else out.strip()
-                    # Extract just the error line
-                    error_lines = [l for l in (out + "\n" + err).splitlines() if "ERROR:" in l.upper()]
-                    error_summary = error_lines[0] if error_lines else error_msg[:200]
-                    
-                    results.append({
-                        "file": sql_file,
-                        "status": "error",
-                        "duration": f"{duration_ms}ms",
-                        "error": error_summary,
-                        "detail": error_msg[:500] if len(error_msg) > 500 else error_msg
-                    })
-                    has_any_error = True
-                    if not failed_file:
-                        failed_file = sql_file
-                        failed_error = error_summary
-                else:
-                    results.append({
-                        "file": sql_file,
-                        "status": "success",
-                        "duration": f"{duration_ms}ms"
-                    })
-                    
-                    # Collect warnings
-                    for line in (out + "\n" + err).splitlines():
-                        if "WARNING:" in line.upper() or "NOTICE:" in line.upper():
-                            all_warnings.append(f"[{sql_file}] {line}")
-                            
-            except subprocess.TimeoutExpired:
-                duration_ms = int((time.time() - start_time) * 1000)
-                results.append({
-                    "file": sql_file,
-                    "status": "error",
-                    "duration": f"{duration_ms}ms",
-                    "error": "Timeout after 60 seconds"
-                })
-                has_any_error = True
-                if not failed_file:
-                    failed_file = sql_file
-                    failed_error = "Timeout"
-            except Exception as ex:
-                duration_ms = int((time.time() - start_time) * 1000)
-                results.append({
-                    "file": sql_file,
-                    "status": "error",
-                    "duration": f"{duration_ms}ms",
-                    "error": str(ex)
-                })
-                has_any_error = True
-                if not failed_file:
-                    failed_file = sql_file
-                    failed_error = str(ex)
+        # Run every file in one psql session: one fork, TLS handshake and auth
+        # instead of one per file. ON_ERROR_STOP halts at the first failing file.
+        sql_paths = [os.path.join(sync_parts_dir, f) for f in sql_files]
+        # Post-sync: populate admin secrets over the same connection, once all files succeeded
+        secret_sql = _admin_secrets_sql()
+        cmd = _build_sql_batch_cmd(safe_db_url, sql_paths, trailing_stdin=secret_sql is not None)
+        timeout_secs = 60 * len(sql_files)
+        start_ns = time.perf_counter_ns()
+        forced_error = None
+        try:
+            # Pass safe_db_url and explicit password
+            res = _run_psql_with_ssl_fallback(cmd, safe_db_url, password=db_password, timeout_secs=timeout_secs, input_text=secret_sql)
+            out, err, returncode = (res.stdout or ""), (res.stderr or ""), res.returncode
+        except subprocess.TimeoutExpired as ex:
+            # Partial output still tells us which file was running
+            out, err, returncode = ex.stdout or "", ex.stderr or "", -1
+            out = out.decode("utf-8", errors="replace") if isinstance(out, bytes) else out
+            err = err.decode("utf-8", errors="replace") if isinstance(err, bytes) else err
+            forced_error = f"Timeout after {timeout_secs} seconds"
+        except Exception as ex:
+            out, err, returncode = "", "", -1
+            forced_error = str(ex) or "Failed to run psql"
+        elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+
+        results, all_warnings, secret_error = _parse_sql_batch_output(
+            sql_files, sql_paths, out, err, returncode, elapsed_ms, forced_error
+        )
+
+        failed = next((r for r in results if r["status"] == "error"), None)
+        has_any_error = failed is not None
+        failed_file = failed["file"] if failed else None
         
         # Calculate summary
         success_count = len([r for r in results if r["status"] == "success"])
         error_count = len([r for r in results if r["status"] == "error"])
         
         if has_any_error:
-            try:
-                _log_admin_action("sync_schema_partial", detail={
-                    "results": results,
-                    "successCount": success_count,
-                    "errorCount": error_count,
-                    "failedFile": failed_file
-                })
-            except Exception:
-                pass
+            _log_admin_action("sync_schema_partial", detail={
+                "results": results,
+                "successCount": success_count,
+                "errorCount": error_count,
+                "failedFile": failed_file
+            })
             return jsonify({
                 "ok": False,
                 "error": f"Schema sync failed at: {failed_file}",
@@ -1249,51 +1843,15 @@ def sync_schema():
         # All files succeeded
         warnings = all_warnings
 
-        # --- POST-SYNC: Populate Admin Secrets ---
-        try:
-            supa_url_raw = os.environ.get("SUPABASE_URL") or os.environ.get("VITE_SUPABASE_URL")
-            supa_key_raw = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-            
-            if supa_url_raw and supa_key_raw:
-                # Basic SQL injection protection: escape single quotes
-                supa_url = supa_url_raw.replace("'", "''")
-                supa_key = supa_key_raw.replace("'", "''")
-
-                secret_sql = f"""
-                INSERT INTO public.admin_secrets (key, value)
-                VALUES ('SUPABASE_URL', '{supa_url}'), ('SUPABASE_SERVICE_ROLE_KEY', '{supa_key}')
-                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now();
-                """
-                # Use subprocess to pipe SQL to psql to avoid escaping issues with shell arguments
-                # Use same SSL environment as the main psql call
-                # Also ensure PGPASSWORD is in env if available
-                if db_password:
-                    psql_env["PGPASSWORD"] = db_password
-
-                p = subprocess.Popen(
-                    ["psql", safe_db_url, "-q", "-f", "-"],
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    env=psql_env
-                )
-                _, secret_err = p.communicate(input=secret_sql)
-                if p.returncode != 0:
-                    warnings.append(f"Failed to update admin_secrets: {secret_err}")
-        except Exception as ex:
-            warnings.append(f"Failed to update admin_secrets: {str(ex)}")
-        # -----------------------------------------
+        if secret_error:
+            warnings.append(f"Failed to update admin_secrets: {secret_error}")
         
-        try:
-            _log_admin_action("sync_schema", detail={
-                "results": results,
-                "successCount": success_count,
-                "totalFiles": len(sql_files),
-                "warnings": warnings
-            })
-        except Exception:
-            pass
+        _log_admin_action("sync_schema", detail={
+            "results": results,
+            "successCount": success_count,
+            "totalFiles": len(sql_files),
+            "warnings": warnings
+        })
         return jsonify({
             "ok": True, 
             "message": f"Schema synchronized successfully ({len(sql_files)} files)",
@@ -1304,10 +1862,7 @@ def sync_schema():
             "warnings": warnings[:20]  # Limit warnings
         })
     except Exception as e:
-        try:
-            _log_admin_action("sync_schema_failed", detail={"error": str(e) or "Failed to run psql"})
-        except Exception:
-            pass
+        _log_admin_action("sync_schema_failed", detail={"error": str(e) or "Failed to run psql"})
         return jsonify({"ok": False, "error": str(e) or "Failed to run psql"}), 500
 
 
@@ -1319,7 +1874,7 @@ def _setup_script_path(repo_root: str) -> str:
 def run_setup():
     """Run setup.sh with provided root password. Requires password in body."""
     _verify_request()
-    body = request.get_json(silent=True) or {}
+    body = _json_body()
     password = body.get("password", "")
     if not password:
         return jsonify({"ok": False, "error": "Root password required"}), 400
@@ -1331,81 +1886,73 @@ def run_setup():
 
     _ensure_executable(script_path)
 
-    try:
-        _log_admin_action("run_setup", "setup.sh")
-    except Exception:
-        pass
+    _log_admin_action("run_setup", "setup.sh")
 
     # Run setup.sh using sudo with password via stdin
     def generate():
-        yield "event: open\ndata: {\"ok\": true, \"message\": \"Starting setup.sh...\"}\n\n"
+        yield b"event: open\ndata: {\"ok\": true, \"message\": \"Starting setup.sh...\"}\n\n"
         try:
             env = os.environ.copy()
             env["CI"] = "true"  # Non-interactive mode
 
             # Use sudo -S to read password from stdin
             p = subprocess.Popen(
-                ["sudo", "-S", script_path],
+                # -p "" keeps sudo from printing its password prompt into the stream
+                ["sudo", "-S", "-p", "", script_path],
                 cwd=repo_root,
                 env=env,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
+                bufsize=0,
             )
 
             # Send password to sudo
             try:
-                p.stdin.write(password + "\n")
+                p.stdin.write((password + "\n").encode("utf-8"))
                 p.stdin.flush()
                 p.stdin.close()
             except Exception:
                 pass
 
             try:
-                assert p.stdout is not None
-                for line in p.stdout:
-                    txt = line.rstrip("\n\r")
-                    if not txt:
-                        continue
-                    # Skip password prompt echoes
-                    if "[sudo]" in txt.lower() or "password" in txt.lower():
-                        continue
-                    # Truncate very long lines
-                    if len(txt) > 4000:
-                        txt = txt[:4000] + "…"
-                    yield f"data: {txt}\n\n"
+                # Still drop anything mentioning a password (retry notices, script echoes)
+                yield from _iter_sse_output(p, skip_line=_SUDO_PROMPT_RE.search)
             finally:
                 code = p.wait()
                 if code == 0:
-                    yield "event: done\ndata: {\"ok\": true}\n\n"
+                    yield _SSE_DONE_OK
                 else:
-                    yield f"event: done\ndata: {{\"ok\": false, \"code\": {code}}}\n\n"
+                    yield _SSE_DONE_FAILED % code
         except Exception as e:
-            yield f"event: error\ndata: {str(e)}\n\n"
+            yield _sse_error_frame(e)
 
-    return Response(generate(), mimetype="text/event-stream")
+    return _sse_response(generate())
 
 
 @app.post("/admin/clear-memory")
 def clear_memory():
     """Clear system memory cache (sync + drop_caches)."""
     _verify_request()
-    try:
-        _log_admin_action("clear_memory", "system")
-    except Exception:
-        pass
+    _log_admin_action("clear_memory", "system")
 
     try:
         # Sync filesystem first
-        subprocess.run(["sync"], check=True, timeout=30)
+        os.sync()
         # Drop page cache, dentries and inodes (value 3)
-        subprocess.run(
-            ["sudo", "bash", "-c", "echo 3 > /proc/sys/vm/drop_caches"],
-            check=True,
-            timeout=30
-        )
+        if os.geteuid() == 0:
+            with open("/proc/sys/vm/drop_caches", "wb", buffering=0) as f:
+                f.write(b"3\n")
+        else:
+            # Covered by the NOPASSWD /usr/bin/tee rule setup.sh installs in
+            # /etc/sudoers.d/plantswipe-admin-api
+            subprocess.run(
+                ["sudo", "-n", "tee", "/proc/sys/vm/drop_caches"],
+                input=b"3\n",
+                stdout=subprocess.DEVNULL,
+                check=True,
+                timeout=30
+            )
         return jsonify({
             "ok": True,
             "message": "Memory cache cleared successfully"
@@ -1416,91 +1963,83 @@ def clear_memory():
         return jsonify({"ok": False, "error": str(e) or "Failed to clear memory"}), 500
 
 
+# Reload nginx, then restart the app services, in one privileged shell so sudo
+# authenticates once. admin-api must come last: restarting it ends the stream.
+# Each systemctl call is bounded by timeout(1); a timed-out step stops the script
+# with timeout's exit code so the stream reports it instead of hanging.
+_RESTART_TIMEOUT_EXIT_CODE = 124
+_RESTART_SERVICES_SCRIPT = """
+echo '[restart] Reloading nginx...'
+timeout 30 systemctl reload nginx 2>&1; rc=$?
+if [ $rc -eq 124 ]; then echo '[restart] nginx reload timed out after 30s'; exit 124; fi
+if [ $rc -ne 0 ]; then echo "[restart] Warning: nginx reload returned code $rc"; else echo '[restart] nginx reloaded'; fi
+for svc in plant-swipe-node admin-api; do
+  echo "[restart] Restarting $svc..."
+  timeout 60 systemctl restart "$svc" 2>&1; rc=$?
+  if [ $rc -eq 124 ]; then echo "[restart] $svc restart timed out after 60s"; exit 124; fi
+  if [ $rc -ne 0 ]; then echo "[restart] Warning: $svc restart returned code $rc"; else echo "[restart] $svc restarted"; fi
+done
+"""
+
+
 @app.post("/admin/restart-server")
 def restart_server_with_password():
     """Restart server services with provided root password. Requires password in body."""
     _verify_request()
-    body = request.get_json(silent=True) or {}
+    body = _json_body()
     password = body.get("password", "")
     if not password:
         return jsonify({"ok": False, "error": "Root password required"}), 400
 
-    try:
-        _log_admin_action("restart_server", "services")
-    except Exception:
-        pass
+    _log_admin_action("restart_server", "services")
 
     def generate():
-        yield "event: open\ndata: {\"ok\": true, \"message\": \"Starting server restart...\"}\n\n"
+        yield b"event: open\ndata: {\"ok\": true, \"message\": \"Starting server restart...\"}\n\n"
         try:
-            services = ["nginx", "plant-swipe-node", "admin-api"]
-            
-            # First reload nginx
-            yield "data: [restart] Reloading nginx...\n\n"
             p = subprocess.Popen(
-                ["sudo", "-S", "systemctl", "reload", "nginx"],
+                # -p "" keeps sudo's password prompt out of the stream; its errors
+                # (and systemctl's) are merged in so the operator sees them
+                ["sudo", "-S", "-p", "", "bash", "-c", _RESTART_SERVICES_SCRIPT],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
+                bufsize=0,
             )
             try:
-                p.stdin.write(password + "\n")
-                p.stdin.flush()
+                p.stdin.write((password + "\n").encode("utf-8"))
                 p.stdin.close()
             except Exception:
                 pass
-            out, _ = p.communicate(timeout=30)
-            if p.returncode != 0:
-                yield f"data: [restart] Warning: nginx reload returned code {p.returncode}\n\n"
-            else:
-                yield "data: [restart] nginx reloaded\n\n"
-
-            # Restart each service
-            for svc in ["plant-swipe-node", "admin-api"]:
-                yield f"data: [restart] Restarting {svc}...\n\n"
-                p = subprocess.Popen(
-                    ["sudo", "-S", "systemctl", "restart", svc],
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                )
-                try:
-                    p.stdin.write(password + "\n")
-                    p.stdin.flush()
-                    p.stdin.close()
-                except Exception:
-                    pass
-                out, _ = p.communicate(timeout=60)
-                if p.returncode != 0:
-                    yield f"data: [restart] Warning: {svc} restart returned code {p.returncode}\n\n"
-                else:
-                    yield f"data: [restart] {svc} restarted\n\n"
+            try:
+                yield from _iter_sse_output(p)
+            finally:
+                code = p.wait()
+            if code == _RESTART_TIMEOUT_EXIT_CODE:
+                yield b"event: error\ndata: Operation timed out\n\n"
+                return
+            if code != 0:
+                yield f"data: [restart] Warning: restart returned code {code}\n\n".encode("utf-8")
+                yield _SSE_DONE_FAILED % code
+                return
 
-            yield "data: [restart] All services restarted successfully\n\n"
-            yield "event: done\ndata: {\"ok\": true}\n\n"
-        except subprocess.TimeoutExpired:
-            yield "event: error\ndata: Operation timed out\n\n"
+            yield b"data: [restart] All services restarted successfully\n\n"
+            yield _SSE_DONE_OK
         except Exception as e:
-            yield f"event: error\ndata: {str(e)}\n\n"
+            yield _sse_error_frame(e)
 
-    return Response(generate(), mimetype="text/event-stream")
+    return _sse_response(generate())
 
 
 @app.get("/admin/git-pull/stream")
 def git_pull_stream():
     """Simple git pull as www-data with streaming output."""
     _verify_request()
-    try:
-        _log_admin_action("git_pull", "simple")
-    except Exception:
-        pass
+    _log_admin_action("git_pull", "simple")
 
     repo_root = _get_repo_root()
 
     def generate():
-        yield "event: open\ndata: {\"ok\": true, \"message\": \"Starting git pull...\"}\n\n"
+        yield b"event: open\ndata: {\"ok\": true, \"message\": \"Starting git pull...\"}\n\n"
         try:
             env = os.environ.copy()
             # Run git pull as www-data user
@@ -1511,7 +2050,7 @@ def git_pull_stream():
                 "pull", "--ff-only"
             ]
 
-            yield f"data: [git] Running git pull in {repo_root}\n\n"
+            yield f"data: [git] Running git pull in {repo_root}\n\n".encode("utf-8")
 
             p = subprocess.Popen(
                 git_cmd,
@@ -1519,31 +2058,34 @@ def git_pull_stream():
                 env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
+                bufsize=0,
             )
 
             try:
-                assert p.stdout is not None
-                for line in p.stdout:
-                    txt = line.rstrip("\n\r")
-                    if not txt:
-                        continue
-                    if len(txt) > 4000:
-                        txt = txt[:4000] + "…"
-                    yield f"data: {txt}\n\n"
+                yield from _iter_sse_output(p)
             finally:
                 code = p.wait()
                 if code == 0:
-                    yield "data: [git] Git pull completed successfully\n\n"
-                    yield "event: done\ndata: {\"ok\": true}\n\n"
+                    yield b"data: [git] Git pull completed successfully\n\n"
+                    yield _SSE_DONE_OK
                 else:
-                    yield f"data: [git] Git pull failed with code {code}\n\n"
-                    yield f"event: done\ndata: {{\"ok\": false, \"code\": {code}}}\n\n"
+                    yield f"data: [git] Git pull failed with code {code}\n\n".encode("utf-8")
+                    yield _SSE_DONE_FAILED % code
         except Exception as e:
-            yield f"event: error\ndata: {str(e)}\n\n"
+            yield _sse_error_frame(e)
+
+    return _sse_response(generate())
 
-    return Response(generate(), mimetype="text/event-stream")
+
+# Command output returned in JSON responses is capped to its last bytes
+_OUTPUT_TAIL_MAX_BYTES = 64 * 1024
+
+
+def _output_tail(data: Optional[bytes], limit: int = _OUTPUT_TAIL_MAX_BYTES) -> str:
+    """Decode at most the last ``limit`` bytes of captured output."""
+    if not data:
+        return ""
+    return data[-limit:].decode("utf-8", errors="replace")
 
 
 @app.get("/admin/git-pull")
@@ -1551,10 +2093,7 @@ def git_pull_stream():
 def git_pull():
     """Simple git pull as www-data (non-streaming)."""
     _verify_request()
-    try:
-        _log_admin_action("git_pull", "simple")
-    except Exception:
-        pass
+    _log_admin_action("git_pull", "simple")
 
     repo_root = _get_repo_root()
 
@@ -1570,7 +2109,6 @@ def git_pull():
             git_cmd,
             cwd=repo_root,
             capture_output=True,
-            text=True,
             timeout=120
         )
 
@@ -1578,14 +2116,14 @@ def git_pull():
             return jsonify({
                 "ok": True,
                 "message": "Git pull completed successfully",
-                "output": result.stdout
+                "output": _output_tail(result.stdout)
             })
         else:
             return jsonify({
                 "ok": False,
                 "error": "Git pull failed",
-                "output": result.stdout,
-                "stderr": result.stderr,
+                "output": _output_tail(result.stdout),
+                "stderr": _output_tail(result.stderr),
                 "code": result.returncode
             }), 500
     except subprocess.TimeoutExpired:
@@ -1607,10 +2145,7 @@ def regenerate_sitemap():
     script_path = _sitemap_script_path(repo_root)
     if not os.path.isfile(script_path):
         detail = {"error": "sitemap script not found", "path": script_path}
-        try:
-            _log_admin_action("regenerate_sitemap_failed", detail=detail)
-        except Exception:
-            pass
+        _log_admin_action("regenerate_sitemap_failed", detail=detail)
         return jsonify({"ok": False, "error": f"sitemap script not found at {script_path}"}), 500
 
     _ensure_executable(script_path)
@@ -1629,16 +2164,10 @@ def regenerate_sitemap():
             check=False,
         )
     except subprocess.TimeoutExpired:
-        try:
-            _log_admin_action("regenerate_sitemap_failed", detail={"error": "timeout"})
-        except Exception:
-            pass
+        _log_admin_action("regenerate_sitemap_failed", detail={"error": "timeout"})
         return jsonify({"ok": False, "error": "Sitemap generation timed out"}), 504
     except Exception as e:
-        try:
-            _log_admin_action("regenerate_sitemap_failed", detail={"error": str(e) or "unexpected failure"})
-        except Exception:
-            pass
+        _log_admin_action("regenerate_sitemap_failed", detail={"error": str(e) or "unexpected failure"})
         return jsonify({"ok": False, "error": str(e) or "Failed to run sitemap script"}), 500
 
     stdout = res.stdout or ""
@@ -1651,10 +2180,7 @@ def regenerate_sitemap():
         "stderrTail": stderr_tail or None,
     }
     if res.returncode != 0:
-        try:
-            _log_admin_action("regenerate_sitemap_failed", detail=detail)
-        except Exception:
-            pass
+        _log_admin_action("regenerate_sitemap_failed", detail=detail)
         return jsonify({
             "ok": False,
             "error": "Sitemap generation failed",
@@ -1663,10 +2189,7 @@ def regenerate_sitemap():
             "stderr": stderr_tail,
         }), 500
 
-    try:
-        _log_admin_action("regenerate_sitemap", detail=detail)
-    except Exception:
-        pass
+    _log_admin_action("regenerate_sitemap", detail=detail)
     return jsonify({
         "ok": True,
         "message": "Sitemap regenerated successfully",
@@ -7,13 +7,32 @@ import subprocess
 def set_token(env_path: str) -> str:
     token = secrets.token_hex(24)
     path = pathlib.Path(env_path)
-    lines = []
-    if path.exists():
-        for line in path.read_text().splitlines():
-            if not line.startswith("ADMIN_STATIC_TOKEN="):
-                lines.append(line)
-    lines.append(f"ADMIN_STATIC_TOKEN={token}")
-    path.write_text("\n".join(lines) + "\n")
+    # Write the new file next to the old one and swap it in, so a crash never
+    # leaves a truncated env file behind
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o600
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, "wb") as wf:
+            try:
+                with path.open("rb") as rf:
+                    for line in rf:
+                        if line.startswith(b"ADMIN_STATIC_TOKEN="):
+                            continue
+                        wf.write(line if line.endswith(b"\n") else line + b"\n")
+            except FileNotFoundError:
+                pass
+            wf.write(f"ADMIN_STATIC_TOKEN={token}\n".encode("ascii"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
     return token
 
 
@@ -26,4 +45,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, _log_admin_action
+
+
+@patch("app._LOG_BATCH_DELAY_SECS", 0)
+class TestLogAdminAction(unittest.TestCase):
+    def setUp(self):
+        patchers = [
+            patch("app._LOG_BATCHES", {}),
+            patch("app._LOG_PENDING", 0),
+            patch("app._LOG_EXECUTOR"),
+            patch("app._NODE_SESSION"),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+        self.session = app_module._NODE_SESSION
+        self.session.post.return_value = MagicMock(status_code=200)
+
+    def _log(self, auth, *args):
+        headers = {"Authorization": auth} if auth else {}
+        with app.test_request_context(headers=headers):
+            _log_admin_action(*args)
+
+    def _flush_scheduled(self):
+        for call in app_module._LOG_EXECUTOR.submit.call_args_list:
+            fn, *args = call[0]
+            fn(*args)
+
+    def test_entries_coalesced_per_caller(self):
+        self._log("Bearer abc", "restart_service", "nginx", {"ok": True})
+        self._log("Bearer abc", "reload_nginx")
+        self._log("", "sync_schema")
+        # One flush per caller, scheduled by the first entry
+        self.assertEqual(app_module._LOG_EXECUTOR.submit.call_count, 2)
+        self._flush_scheduled()
+
+        posts = {c.kwargs["headers"].get("Authorization"): c for c in self.session.post.call_args_list}
+        self.assertEqual(len(posts), 2)
+        abc = posts["Bearer abc"]
+        self.assertEqual(abc.args[0], app_module._LOG_BATCH_URL)
+        self.assertEqual(json.loads(abc.kwargs["data"])["actions"], [
+            {"action": "restart_service", "target": "nginx", "detail": {"ok": True}},
+            {"action": "reload_nginx", "target": None, "detail": {}},
+        ])
+        self.assertEqual(len(json.loads(posts[None].kwargs["data"])["actions"]), 1)
+        # The shared base headers are never mutated
+        self.assertNotIn("Authorization", app_module._LOG_HEADERS)
+        self.assertEqual(app_module._LOG_PENDING, 0)
+
+    def test_falls_back_to_single_posts_without_batch_endpoint(self):
+        self.session.post.return_value = MagicMock(status_code=404)
+        self._log("", "reload_nginx")
+        self._log("", "reboot")
+        self._flush_scheduled()
+        urls = [c.args[0] for c in self.session.post.call_args_list]
+        self.assertEqual(urls, [app_module._LOG_BATCH_URL, app_module._LOG_URL, app_module._LOG_URL])
+
+    def test_entry_dropped_when_backlog_full(self):
+        with patch("app._LOG_PENDING", app_module._LOG_MAX_PENDING):
+            self._log("", "reload_nginx")
+        app_module._LOG_EXECUTOR.submit.assert_not_called()
+        self.assertEqual(app_module._LOG_BATCHES, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import hashlib
+import hmac
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app
+
+SECRET = "test-secret"
+STATIC_TOKEN = "static-token"
+
+
+@patch("app.ADMIN_STATIC_TOKEN", STATIC_TOKEN)
+@patch("app._STATIC_TOKEN_BYTES", STATIC_TOKEN.encode("utf-8"))
+@patch("app._STATIC_TOKEN_ENABLED", 1)
+@patch("app._HMAC_PROTO", hmac.new(SECRET.encode("utf-8"), digestmod="sha256"))
+@patch("app.APP_SECRET", SECRET)
+class TestVerifyRequest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        # Accepted requests reach the maintenance-mode handler: keep it off the
+        # live state file and away from the Node audit log
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in (
+            patch("app.MAINTENANCE_MODE_FILE", os.path.join(tmp.name, "maintenance.json")),
+            patch("app._log_admin_action"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app_module._invalidate_maintenance_cache()
+        self.addCleanup(app_module._invalidate_maintenance_cache)
+
+    def _post(self, body=b"{}", headers=None):
+        return self.client.post(
+            "/admin/maintenance-mode/disable",
+            data=body,
+            headers=headers or {},
+            content_type="application/json",
+        )
+
+    def test_missing_credentials_rejected(self):
+        self.assertEqual(self._post().status_code, 401)
+
+    def test_static_token_accepted(self):
+        res = self._post(headers={"X-Admin-Token": STATIC_TOKEN})
+        self.assertEqual(res.status_code, 200)
+
+    def test_wrong_static_token_rejected(self):
+        res = self._post(headers={"X-Admin-Token": "nope"})
+        self.assertEqual(res.status_code, 401)
+
+    def test_unset_static_token_never_matches(self):
+        with patch("app._STATIC_TOKEN_BYTES", b""), patch("app._STATIC_TOKEN_ENABLED", 0):
+            res = self._post(headers={"X-Admin-Token": ""})
+            self.assertEqual(res.status_code, 401)
+
+    def test_non_ascii_static_token_rejected(self):
+        res = self._post(headers={"X-Admin-Token": "jeton-\u00e9"})
+        self.assertEqual(res.status_code, 401)
+
+    def test_hmac_signature_accepted(self):
+        body = b'{"reason": "test"}'
+        sig = hmac.new(SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        res = self._post(body=body, headers={"X-Button-Token": sig})
+        self.assertEqual(res.status_code, 200)
+
+    def test_bad_hmac_signature_rejected(self):
+        body = b'{"reason": "test"}'
+        sig = hmac.new(b"other", body, hashlib.sha256).hexdigest()
+        res = self._post(body=body, headers={"X-Button-Token": sig})
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(res.get_json()["error"], "Unauthorized")
+
+    def test_uppercase_hex_signature_accepted(self):
+        body = b'{"reason": "test"}'
+        sig = hmac.new(SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest().upper()
+        res = self._post(body=body, headers={"X-Button-Token": sig})
+        self.assertEqual(res.status_code, 200)
+
+    def test_non_hex_signature_rejected(self):
+        res = self._post(headers={"X-Button-Token": "not-a-signature"})
+        self.assertEqual(res.status_code, 401)
+
+    def test_wrong_length_signature_rejected_before_body_read(self):
+        sig = hmac.new(SECRET.encode("utf-8"), b"{}", hashlib.sha256).hexdigest()
+        with patch("flask.Request.get_data") as mock_get_data:
+            res = self._post(headers={"X-Button-Token": sig + "00"})
+        self.assertEqual(res.status_code, 401)
+        mock_get_data.assert_not_called()
+
+    def test_default_secret_fails_closed(self):
+        with patch("app.APP_SECRET", "change-me"):
+            res = self._post(headers={"X-Admin-Token": STATIC_TOKEN})
+        self.assertEqual(res.status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import _for_each_ref_branches, _validate_branch_name
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", "-C", cwd, *args],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+class TestForEachRefBranches(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.origin = os.path.join(tmp.name, "origin")
+        self.repo = os.path.join(tmp.name, "repo")
+        os.makedirs(self.origin)
+        _git(self.origin, "init", "-q", "-b", "main")
+        _git(self.origin, "commit", "-q", "--allow-empty", "-m", "init")
+        for name in ("dev", "feature/login", "feature/deep/nested"):
+            _git(self.origin, "branch", name)
+        subprocess.run(["git", "clone", "-q", self.origin, self.repo], check=True, stderr=subprocess.DEVNULL)
+        self.git_argv = ["git", "-C", self.repo]
+
+    def test_loose_and_packed_refs(self):
+        remote = ["dev", "feature/deep/nested", "feature/login", "main"]
+        self.assertEqual(_for_each_ref_branches(self.git_argv), (remote, ["main"], "main"))
+        _git(self.repo, "pack-refs", "--all")
+        _git(self.repo, "branch", "local/only")
+        self.assertEqual(_for_each_ref_branches(self.git_argv), (remote, ["local/only", "main"], "main"))
+
+    def test_detached_head(self):
+        _git(self.repo, "checkout", "-q", "--detach")
+        self.assertEqual(_for_each_ref_branches(self.git_argv)[2], "HEAD")
+
+    @patch("app._FETCH_LAST", None)
+    @patch("app._verify_request")
+    def test_refresh_fetches_before_listing(self, _verify):
+        _git(self.origin, "branch", "hotfix")
+        with patch("app._get_repo_root", return_value=self.repo), patch("app._schedule_remote_update") as bg:
+            client = app_module.app.test_client()
+            self.assertNotIn("hotfix", client.get("/admin/branches").get_json()["branches"])
+            bg.assert_called_once()
+            data = client.get("/admin/branches?refresh=1").get_json()
+        self.assertIn("hotfix", data["branches"])
+        self.assertNotIn("warning", data)
+        bg.assert_called_once()
+
+
+@patch.dict(os.environ, {"PLANTSWIPE_REPO_DIR": ""})
+@patch("app._REPO_ROOT_CACHE", None)
+@patch("app._REPO_ROOT_RETRY_AT", 0.0)
+class TestRepoRoot(unittest.TestCase):
+    @patch("app.subprocess.check_output", return_value=b"/srv/plantswipe\n")
+    def test_resolved_once(self, mock_git):
+        self.assertEqual(app_module._get_repo_root(), "/srv/plantswipe")
+        self.assertEqual(app_module._get_repo_root(), "/srv/plantswipe")
+        self.assertEqual(mock_git.call_count, 1)
+
+    @patch("app.subprocess.check_output", side_effect=subprocess.CalledProcessError(128, "git"))
+    def test_failed_lookup_not_retried_immediately(self, mock_git):
+        first = app_module._get_repo_root()
+        self.assertEqual(app_module._get_repo_root(), first)
+        self.assertEqual(mock_git.call_count, 1)
+        with patch("app._REPO_ROOT_RETRY_AT", 0.0):
+            app_module._get_repo_root()
+        self.assertEqual(mock_git.call_count, 2)
+
+
+class TestValidateBranchName(unittest.TestCase):
+    def test_accepted(self):
+        for name in ("", "main", "feature/new-ui", "release-1.2_rc", "a" * 255):
+            self.assertTrue(_validate_branch_name(name), name)
+
+    def test_rejected(self):
+        for name in ("-main", "a..b", "a//b", "a b", "main\n", "br\u00e4nch", "$(id)", "a" * 256):
+            self.assertFalse(_validate_branch_name(name), name)
+
+
+class TestLastUpdateTime(unittest.TestCase):
+    def test_read_bounded_and_refreshed_on_change(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "TIME")
+            with open(path, "w") as f:
+                f.write("2024-05-01T10:00:00Z\n" + "x" * 1000)
+            value = app_module._read_last_update_time(d)
+            self.assertTrue(value.startswith("2024-05-01T10:00:00Z"))
+            self.assertLessEqual(len(value), app_module._TIME_FILE_MAX_BYTES)
+
+            with open(path, "w") as f:
+                f.write("2024-06-01T10:00:00Z\n")
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            self.assertEqual(app_module._read_last_update_time(d), "2024-06-01T10:00:00Z")
+
+            os.unlink(path)
+            self.assertIsNone(app_module._read_last_update_time(d))
+
+
+if __name__ == "__main__":
+    unittest.main()
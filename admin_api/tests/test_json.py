@@ -0,0 +1,62 @@
+import datetime
+import decimal
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, _json_body
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+
+class TestJsonProvider(unittest.TestCase):
+    def test_matches_default_provider(self):
+        payload = {
+            "b": 1,
+            "a": [datetime.datetime(2024, 1, 1), datetime.date(2024, 1, 2)],
+            "d": decimal.Decimal("1.5"),
+            "big": 2 ** 70,
+            "text": "plante é",
+        }
+        with app.test_request_context():
+            body = jsonify(payload).get_data()
+        expected = DefaultJSONProvider(app).dumps(payload)
+        self.assertEqual(json.loads(body), json.loads(expected))
+        self.assertTrue(body.startswith(b'{"a":'))
+
+    def test_request_json_parsed(self):
+        with app.test_request_context(json={"branch": "main"}):
+            from flask import request
+            self.assertEqual(request.get_json(), {"branch": "main"})
+
+    def test_request_json_accepts_non_finite_numbers(self):
+        with app.test_request_context(data=b'{"a": NaN, "b": Infinity}', content_type="application/json"):
+            from flask import request
+            data = request.get_json()
+        self.assertNotEqual(data["a"], data["a"])
+        self.assertEqual(data["b"], float("inf"))
+
+    def test_json_body(self):
+        cases = [
+            ({"data": b"", "content_type": "application/json"}, {}),
+            ({"json": [1, 2]}, {}),
+            ({"data": b"branch=main"}, {}),
+            ({"json": {"branch": "main"}}, {"branch": "main"}),
+        ]
+        for kwargs, expected in cases:
+            with app.test_request_context(method="POST", **kwargs):
+                self.assertEqual(_json_body(), expected)
+
+    def test_health_body(self):
+        res = app.test_client().get("/health")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, "application/json")
+        self.assertEqual(res.get_json(), {"ok": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+class TestMaintenanceModeCache(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.unlink(self.path)
+        patcher = patch("app.MAINTENANCE_MODE_FILE", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app._invalidate_maintenance_cache()
+        self.addCleanup(app._invalidate_maintenance_cache)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _write(self, data):
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+    def test_missing_file_is_inactive(self):
+        self.assertEqual(app._get_maintenance_mode(), {"active": False})
+
+    def test_cached_within_ttl(self):
+        self.assertFalse(app._get_maintenance_mode()["active"])
+        self._write({"expiresAt": int(time.time() * 1000) + 60000, "reason": "test"})
+        # Still inside the TTL window: the stale (inactive) status is served
+        self.assertFalse(app._get_maintenance_mode()["active"])
+        app._invalidate_maintenance_cache()
+        status = app._get_maintenance_mode()
+        self.assertTrue(status["active"])
+        self.assertEqual(status["reason"], "test")
+
+    def test_zero_max_age_revalidates_by_mtime(self):
+        self.assertFalse(app._get_maintenance_mode()["active"])
+        self._write({"expiresAt": int(time.time() * 1000) + 60000})
+        self.assertTrue(app._get_maintenance_mode(max_age=0)["active"])
+        with patch("app._json_loads") as mock_loads:
+            self.assertTrue(app._get_maintenance_mode(max_age=0)["active"])
+        mock_loads.assert_not_called()
+
+    def test_expired_file_is_removed(self):
+        self._write({"expiresAt": int(time.time() * 1000) - 1000})
+        self.assertEqual(app._get_maintenance_mode(), {"active": False})
+        self.assertFalse(os.path.exists(self.path))
+
+    @patch("app._verify_request")
+    def test_enable_writes_compact_file_atomically(self, _):
+        res = app.app.test_client().post("/admin/maintenance-mode/enable", json={"reason": "deploy"})
+        self.assertTrue(res.get_json()["ok"])
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        self.assertNotIn(b"\n", raw)
+        self.assertEqual(json.loads(raw)["reason"], "deploy")
+        # No temp files are left next to the maintenance file
+        prefix = "." + os.path.basename(self.path) + "."
+        self.assertEqual([n for n in os.listdir(os.path.dirname(self.path)) if n.startswith(prefix)], [])
+        self.assertTrue(app._get_maintenance_mode()["active"])
+
+
+if __name__ == "__main__":
+    unittest.main()
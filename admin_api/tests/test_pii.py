@@ -2,6 +2,7 @@ import sys
 import os
 import unittest
 import json
+import time
 
 # Add parent directory to path to import app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -28,6 +29,33 @@ class TestPIIScrubbing(unittest.TestCase):
         self.assertIn("REDACTED", scrubbed)
         self.assertNotIn("secret", scrubbed)
 
+    def test_scrub_pii_email_and_bearer(self):
+        res = _scrub_pii_from_string("user jane.doe@example.com sent Authorization: Bearer abc.def-123")
+        self.assertIn("[EMAIL_REDACTED]", res)
+        self.assertIn("Bearer [REDACTED]", res)
+        self.assertNotIn("jane.doe@example.com", res)
+        self.assertNotIn("abc.def-123", res)
+
+    def test_bearer_token_containing_email_is_redacted_whole(self):
+        res = _scrub_pii_from_string("Authorization: Bearer abc.def-user@example.com")
+        self.assertEqual(res, "Authorization: Bearer [REDACTED]")
+        res = _scrub_pii_from_string("Bearer eyJ0eXAi.eyJzdWIi/x+y== next")
+        self.assertEqual(res, "Bearer [REDACTED] next")
+
+    def test_email_scan_is_linear_on_long_runs(self):
+        # Each blob carries an "@" so it gets past the trigger prefilter to the regex
+        for blob in ("a" * 50000 + "@", "a.b" * 20000 + "@x", "-" * 50000 + "@"):
+            start = time.perf_counter()
+            self.assertEqual(_scrub_pii_from_string(blob), blob)
+            self.assertLess(time.perf_counter() - start, 0.1)
+        res = _scrub_pii_from_string("see .jane.doe+1@example.co.uk, hash " + "f" * 64)
+        self.assertEqual(res, "see [EMAIL_REDACTED], hash " + "f" * 64)
+
+    def test_prefilter_keeps_case_insensitive_password_match(self):
+        self.assertEqual(_scrub_pii_from_string("no secrets here"), "no secrets here")
+        res = _scrub_pii_from_string("PassWord=hunter2")
+        self.assertNotIn("hunter2", res)
+
     def test_sentry_before_send_dict(self):
         # Dictionary data - current implementation skips this
         event = {
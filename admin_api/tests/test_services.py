@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, _is_service_allowed, _parse_allowed_services
+
+
+class TestAllowedServices(unittest.TestCase):
+    def test_both_unit_forms_are_stored(self):
+        allowed = _parse_allowed_services(" nginx, admin-api.service ,,plant-swipe-node")
+        self.assertEqual(allowed, frozenset({
+            "nginx", "nginx.service",
+            "admin-api", "admin-api.service",
+            "plant-swipe-node", "plant-swipe-node.service",
+        }))
+
+    def test_membership(self):
+        with patch("app.ALLOWED_SERVICES", _parse_allowed_services("nginx")):
+            self.assertTrue(_is_service_allowed("nginx"))
+            self.assertTrue(_is_service_allowed("nginx.service"))
+            self.assertFalse(_is_service_allowed("sshd"))
+            self.assertFalse(_is_service_allowed("nginx.service.service"))
+
+
+@patch("app._log_admin_action")
+@patch("app._verify_request")
+class TestRestartServer(unittest.TestCase):
+    """Runs the real restart script, with sudo dropped and systemctl/timeout faked on PATH."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.bin = tmp.name
+        self._fake("systemctl", 'echo "systemctl: $1 $2 failed" >&2; exit 1')
+        real_popen = subprocess.Popen
+
+        def popen(cmd, **kwargs):
+            assert cmd[:4] == ["sudo", "-S", "-p", ""], cmd
+            env = dict(os.environ, PATH=f"{self.bin}:{os.environ['PATH']}")
+            return real_popen(cmd[4:], env=env, **kwargs)
+
+        patcher = patch("app.subprocess.Popen", side_effect=popen)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fake(self, name, body):
+        path = os.path.join(self.bin, name)
+        with open(path, "w") as f:
+            f.write(f"#!/bin/sh\n{body}\n")
+        os.chmod(path, 0o755)
+
+    def _restart(self):
+        res = app.test_client().post("/admin/restart-server", json={"password": "pw"})
+        return b"".join(res.response).decode("utf-8")
+
+    def test_systemctl_errors_reach_the_stream(self, *_):
+        out = self._restart()
+        self.assertIn("systemctl: reload nginx failed", out)
+        self.assertIn("Warning: admin-api restart returned code 1", out)
+        self.assertIn('event: done\ndata: {"ok": true}', out)
+
+    def test_timed_out_step_stops_with_error(self, *_):
+        # timeout(1) exits 124 when the command overruns; fake that for restarts
+        self._fake("timeout", 'if [ "$3" = restart ]; then exit 124; fi; shift; exec "$@"')
+        out = self._restart()
+        self.assertIn("plant-swipe-node restart timed out after 60s", out)
+        self.assertNotIn("Restarting admin-api", out)
+        self.assertIn("event: error\ndata: Operation timed out", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
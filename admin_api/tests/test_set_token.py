@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import set_token
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from set_token import set_token
+
+
+class TestSetToken(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "env")
+
+    def test_token_replaced_and_other_lines_kept(self):
+        with open(self.path, "w") as f:
+            f.write("APP_SECRET=x\nADMIN_STATIC_TOKEN=old\nOTHER=y")
+        os.chmod(self.path, 0o600)
+        token = set_token(self.path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), f"APP_SECRET=x\nOTHER=y\nADMIN_STATIC_TOKEN={token}\n")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(self.tmp.name), ["env"])
+
+    def test_missing_file_created(self):
+        token = set_token(self.path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), f"ADMIN_STATIC_TOKEN={token}\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, _iter_sse_output, _sse_response
+
+
+def _frames_to_lines(frames):
+    lines = []
+    for frame in frames:
+        frame = frame.decode("utf-8")
+        assert frame.endswith("\n\n"), frame
+        for line in frame[:-2].split("\n"):
+            assert line.startswith("data: "), line
+            lines.append(line[len("data: "):])
+    return lines
+
+
+class TestSseOutput(unittest.TestCase):
+    def _run(self, script):
+        p = subprocess.Popen(
+            [sys.executable, "-c", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+        )
+        try:
+            return list(_iter_sse_output(p))
+        finally:
+            p.wait()
+
+    def test_lines_are_forwarded_in_order(self):
+        frames = self._run("for i in range(100): print(f'line {i}')")
+        self.assertEqual(_frames_to_lines(frames), [f"line {i}" for i in range(100)])
+        # Output is batched rather than one frame per line
+        self.assertLess(len(frames), 100)
+
+    def test_blank_lines_skipped_and_partial_line_flushed(self):
+        frames = self._run("import sys; sys.stdout.write('a\\r\\n\\n\\nb')")
+        self.assertEqual(_frames_to_lines(frames), ["a", "b"])
+
+    def test_non_ascii_lines_preserved(self):
+        frames = self._run("import sys; sys.stdout.buffer.write('Plante \u00e9t\u00e9 \U0001f331\\n'.encode())")
+        self.assertEqual(_frames_to_lines(frames), ["Plante \u00e9t\u00e9 \U0001f331"])
+
+    def test_long_lines_truncated(self):
+        frames = self._run("print('x' * 5000)")
+        (line,) = _frames_to_lines(frames)
+        self.assertEqual(len(line), 4001)
+        self.assertTrue(line.endswith("…"))
+
+    def test_skip_line_filter(self):
+        p = subprocess.Popen(
+            [sys.executable, "-c", "print('[sudo] password for root:'); print('Password:'); print('ok')"],
+            stdout=subprocess.PIPE,
+            bufsize=0,
+        )
+        try:
+            frames = list(_iter_sse_output(p, skip_line=app_module._SUDO_PROMPT_RE.search))
+        finally:
+            p.wait()
+        self.assertEqual(_frames_to_lines(frames), ["ok"])
+
+    def test_keepalive_sent_while_script_is_silent(self):
+        with patch("app._SSE_KEEPALIVE_SECS", 0.05):
+            frames = self._run("import time; print('a', flush=True); time.sleep(0.3); print('b')")
+        self.assertIn(b": keepalive\n\n", frames)
+        self.assertEqual(_frames_to_lines([f for f in frames if not f.startswith(b":")]), ["a", "b"])
+
+
+class TestSseResponse(unittest.TestCase):
+    def test_bytes_frames_passed_through(self):
+        frames = [b"event: open\ndata: {}\n\n", b"data: x\n\n"]
+        with app.test_request_context():
+            res = _sse_response(iter(frames))
+        self.assertTrue(res.direct_passthrough)
+        self.assertEqual(res.mimetype, "text/event-stream")
+        self.assertEqual(res.headers["X-Accel-Buffering"], "no")
+        self.assertEqual(b"".join(res.response), b"".join(frames))
+
+    def test_error_frame_keeps_framing_for_multiline_messages(self):
+        frame = app_module._sse_error_frame(RuntimeError("first\nsecond"))
+        self.assertEqual(frame, b"event: error\ndata: first\ndata: second\n\n")
+        self.assertEqual(app_module._SSE_DONE_FAILED % 3, b'event: done\ndata: {"ok": false, "code": 3}\n\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8632,63 +8632,80 @@ app.post('/api/admin/ai/plant-fill/batch', async (req, res) => {
   }
 })
 
+// Validate one logged admin action; returns null when the action name is missing
+function normalizeAdminLogAction(body) {
+  const action = typeof body?.action === 'string' ? body.action.trim() : ''
+  if (!action) return null
+  const target = (body.target == null || typeof body.target === 'string') ? body.target : String(body.target)
+  const detail = (body.detail && typeof body.detail === 'object') ? body.detail : {}
+  return { action, target, detail }
+}
+
+// Resolve admin display name for clearer logs
+async function resolveAdminLogName(req, adminId) {
+  let adminName = null
+  try {
+    if (sql && adminId) {
+      try {
+        const rows = await sql`select coalesce(display_name, '') as name from public.profiles where id = ${adminId} limit 1`
+        adminName = (rows?.[0]?.name || '').trim() || null
+      } catch { }
+    }
+    if (!adminName && supabaseUrlEnv && supabaseAnonKey && adminId) {
+      try {
+        const headers = { apikey: supabaseServerApiKey, Accept: 'application/json' }
+        const bearer = getBearerTokenFromRequest(req)
+        if (bearer) headers['Authorization'] = `Bearer ${bearer}`
+        const url = `${supabaseUrlEnv}/rest/v1/profiles?id=eq.${encodeURIComponent(adminId)}&select=display_name&limit=1`
+        const r = await fetch(url, { headers })
+        if (r.ok) {
+          const arr = await r.json().catch(() => [])
+          adminName = Array.isArray(arr) && arr[0] ? (arr[0].display_name || null) : null
+        }
+      } catch { }
+    }
+  } catch { }
+  return adminName
+}
+
+// Insert normalized actions for one admin in a single statement (or a single REST bulk insert)
+async function recordAdminLogActions(req, adminId, actions) {
+  const adminName = await resolveAdminLogName(req, adminId)
+  const rows = actions.map(({ action, target, detail }) => ({
+    admin_id: adminId || null,
+    admin_name: adminName || null,
+    action,
+    target: target || null,
+    detail,
+  }))
+  if (sql) {
+    try {
+      await sql`
+        insert into public.admin_activity_logs (admin_id, admin_name, action, target, detail)
+        select admin_id, admin_name, action, target, detail
+        from jsonb_to_recordset(${sql.json(rows)}) as x(admin_id uuid, admin_name text, action text, target text, detail jsonb)
+      `
+      return true
+    } catch { }
+  }
+  try {
+    return await insertAdminActivityViaRest(req, rows.length === 1 ? rows[0] : rows)
+  } catch {
+    return false
+  }
+}
+
 // Admin: generic log endpoint to record an action from admin_api or UI
 app.post('/api/admin/log-action', async (req, res) => {
   try {
     const adminId = await ensureAdmin(req, res)
     if (!adminId) return
-    const body = req.body || {}
-    const action = typeof body.action === 'string' ? body.action.trim() : ''
-    if (!action) {
+    const entry = normalizeAdminLogAction(req.body || {})
+    if (!entry) {
       res.status(400).json({ error: 'action required' })
       return
     }
-    const target = (body.target == null || typeof body.target === 'string') ? body.target : String(body.target)
-    const detail = (body.detail && typeof body.detail === 'object') ? body.detail : {}
-
-    let adminName = null
-    try {
-      const caller = await getUserFromRequest(req)
-      // Resolve admin display name for clearer logs
-      if (sql && adminId) {
-        try {
-          const rows = await sql`select coalesce(display_name, '') as name from public.profiles where id = ${adminId} limit 1`
-          adminName = (rows?.[0]?.name || '').trim() || null
-        } catch { }
-      }
-      if (!adminName && supabaseUrlEnv && supabaseAnonKey && adminId) {
-        try {
-          const headers = { apikey: supabaseServerApiKey, Accept: 'application/json' }
-          const bearer = getBearerTokenFromRequest(req)
-          if (bearer) headers['Authorization'] = `Bearer ${bearer}`
-          const url = `${supabaseUrlEnv}/rest/v1/profiles?id=eq.${encodeURIComponent(adminId)}&select=display_name&limit=1`
-          const r = await fetch(url, { headers })
-          if (r.ok) {
-            const arr = await r.json().catch(() => [])
-            adminName = Array.isArray(arr) && arr[0] ? (arr[0].display_name || null) : null
-          }
-        } catch { }
-      }
-    } catch { }
-
-    let ok = false
-    if (sql) {
-      try {
-        // Cast to expected types to avoid parameter type ambiguity
-        await sql`
-          insert into public.admin_activity_logs (admin_id, admin_name, action, target, detail)
-          values (${adminId || null}::uuid, ${adminName || null}::text, ${action}::text, ${target || null}::text, ${sql.json(detail)})
-        `
-        ok = true
-      } catch { }
-    }
-    if (!ok) {
-      try {
-        const row = { admin_id: adminId, admin_name: adminName, action, target: target || null, detail }
-        ok = await insertAdminActivityViaRest(req, row)
-      } catch { }
-    }
-    if (!ok) {
+    if (!(await recordAdminLogActions(req, adminId, [entry]))) {
       res.status(500).json({ error: 'Failed to log action' })
       return
     }
@@ -8703,6 +8720,37 @@ app.options('/api/admin/log-action', (_req, res) => {
   res.status(204).end()
 })
 
+// Admin: batched variant of log-action; admin_api coalesces bursts of actions into one request
+const ADMIN_LOG_BATCH_MAX = 64
+app.post('/api/admin/log-actions', async (req, res) => {
+  try {
+    const adminId = await ensureAdmin(req, res)
+    if (!adminId) return
+    const raw = Array.isArray(req.body?.actions) ? req.body.actions : null
+    if (!raw || raw.length === 0 || raw.length > ADMIN_LOG_BATCH_MAX) {
+      res.status(400).json({ error: `actions must be an array of 1-${ADMIN_LOG_BATCH_MAX} entries` })
+      return
+    }
+    const actions = raw.map(normalizeAdminLogAction).filter(Boolean)
+    if (actions.length === 0) {
+      res.status(400).json({ error: 'action required' })
+      return
+    }
+    if (!(await recordAdminLogActions(req, adminId, actions))) {
+      res.status(500).json({ error: 'Failed to log actions' })
+      return
+    }
+    res.json({ ok: true, count: actions.length })
+  } catch (e) {
+    res.status(500).json({ error: e?.message || 'Failed to log actions' })
+  }
+})
+app.options('/api/admin/log-actions', (_req, res) => {
+  res.setHeader('Access-Control-Allow-Methods', 'POST,OPTIONS')
+  res.setHeader('Access-Control-Allow-Headers', 'Authorization, Content-Type, X-Admin-Token')
+  res.status(204).end()
+})
+
 const contactScreenshotUploadMulter = multer({
   storage: multer.memoryStorage(),
   limits: { fileSize: 5 * 1024 * 1024 }, // 5MB
@@ -20993,6 +21041,56 @@ app.options('/api/admin/refresh-aphydle/stream', (_req, res) => {
   res.status(204).end()
 })
 
+const BRANCH_FETCH_INTERVAL_MS = 60 * 1000
+let branchFetchAt = 0
+let branchFetchInFlight = null
+
+// Fetch remote branches with prune to remove deleted branches; resolves to a warning when the remote is unreachable
+async function fetchRemoteBranches(repoRoot) {
+  // Using git fetch --prune origin is more reliable than git remote update --prune
+  try {
+    await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'fetch', '--prune', 'origin'], { timeout: 20000 })
+    console.log('[branches] Successfully fetched and pruned remote branches from origin')
+    branchFetchAt = Date.now()
+    return null
+  } catch (e) {
+    console.warn('[branches] git fetch --prune origin failed:', e?.message || e)
+  }
+  // Fallback: try git remote update --prune as secondary option
+  try {
+    await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'remote', 'update', '--prune'], { timeout: 15000 })
+    console.log('[branches] Fallback: git remote update --prune succeeded')
+    branchFetchAt = Date.now()
+    return null
+  } catch (e2) {
+    console.warn('[branches] Fallback git remote update --prune also failed:', e2?.message || e2)
+    return 'Could not sync with remote - showing cached branches'
+  }
+}
+
+// Remote (origin) and local branch names plus the checked-out branch, from a single git call.
+// A detached HEAD marks no branch and reports "HEAD", like `git rev-parse --abbrev-ref HEAD`.
+async function listBranchRefs(repoRoot) {
+  const { stdout } = await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'for-each-ref', '--format=%(HEAD)%(refname)', 'refs/remotes/origin', 'refs/heads'], { timeout: 5000 })
+  const branches = []
+  const localBranches = []
+  let current = 'HEAD'
+  for (const line of stdout.split('\n')) {
+    if (line.length < 2) continue
+    const ref = line.slice(1).trim()
+    if (ref.startsWith('refs/remotes/origin/')) {
+      const name = ref.slice('refs/remotes/origin/'.length)
+      // Exclude the remote's symbolic HEAD pointer
+      if (name && name !== 'HEAD') branches.push(name)
+    } else if (ref.startsWith('refs/heads/')) {
+      const name = ref.slice('refs/heads/'.length)
+      localBranches.push(name)
+      if (line[0] === '*') current = name
+    }
+  }
+  return { branches, localBranches, current }
+}
+
 // Admin: list remote branches and current branch
 app.get('/api/admin/branches', async (req, res) => {
   try {
@@ -21008,53 +21106,22 @@ app.get('/api/admin/branches', async (req, res) => {
 
     // Always operate from the repository root and mark it safe for this process
     const repoRoot = await getRepoRoot()
-    // Fetch remote branches with prune to remove deleted branches - this is the key operation for refreshing branches
-    // Using git fetch --prune origin is more reliable than git remote update --prune
+    // Fetching from origin is a network round-trip, so it runs at most once per
+    // BRANCH_FETCH_INTERVAL_MS unless the caller asks for ?refresh=1 (the manual refresh button)
+    const forceRefresh = ['1', 'true'].includes(String(req.query.refresh || '').toLowerCase())
     let pruneWarning = null
-    try {
-      await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'fetch', '--prune', 'origin'], { timeout: 20000 })
-      console.log('[branches] Successfully fetched and pruned remote branches from origin')
-    } catch (e) {
-      console.warn('[branches] git fetch --prune origin failed:', e?.message || e)
-      // Fallback: try git remote update --prune as secondary option
-      try {
-        await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'remote', 'update', '--prune'], { timeout: 15000 })
-        console.log('[branches] Fallback: git remote update --prune succeeded')
-      } catch (e2) {
-        console.warn('[branches] Fallback git remote update --prune also failed:', e2?.message || e2)
-        pruneWarning = 'Could not sync with remote - showing cached branches'
+    if (forceRefresh || Date.now() - branchFetchAt > BRANCH_FETCH_INTERVAL_MS) {
+      // Concurrent requests share one in-flight fetch
+      if (!branchFetchInFlight) {
+        branchFetchInFlight = fetchRemoteBranches(repoRoot).finally(() => { branchFetchInFlight = null })
       }
+      pruneWarning = await branchFetchInFlight
     }
-    // Extra safety: explicitly prune any stale remote-tracking refs that might remain
-    try {
-      await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'remote', 'prune', 'origin'], { timeout: 5000 })
-    } catch (e) {
-      // Non-fatal: fetch --prune should have already handled this
-      console.warn('[branches] Extra prune command failed (non-fatal):', e?.message || e)
-    }
-    // Prefer for-each-ref over branch -r to avoid pointer lines and formatting quirks
-    const { stdout: branchesStdout } = await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'for-each-ref', '--format=%(refname:short)', 'refs/remotes/origin'], { timeout: 5000 })
-    let branches = branchesStdout
-      .split('\n')
-      .map(s => s.trim())
-      .filter(Boolean)
-      .map(name => name.replace(/^origin\//, ''))
-      // Exclude HEAD pointer, the remote namespace itself ("origin"), and any symbolic ref lines
-      .filter(name => name !== 'HEAD' && name !== 'origin' && !name.includes('->'))
-      .sort((a, b) => a.localeCompare(b))
-
+    // One for-each-ref lists remote and local branches; %(HEAD) marks the current one with "*"
+    const { branches: remoteBranches, localBranches, current } = await listBranchRefs(repoRoot)
     // Fallback to local branches if remote list is empty (e.g., detached or offline)
-    if (branches.length === 0) {
-      const { stdout: localStdout } = await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'for-each-ref', '--format=%(refname:short)', 'refs/heads'], { timeout: 3000 })
-      branches = localStdout
-        .split('\n')
-        .map(s => s.trim())
-        .filter(Boolean)
-        .sort((a, b) => a.localeCompare(b))
-    }
-
-    const { stdout: currentStdout } = await execFile('git', ['-c', `safe.directory=${repoRoot}`, '-C', repoRoot, 'rev-parse', '--abbrev-ref', 'HEAD'], { timeout: 3000 })
-    const current = currentStdout.trim()
+    const branches = (remoteBranches.length > 0 ? remoteBranches : localBranches)
+      .sort((a, b) => a.localeCompare(b))
 
     // Read the last update time from TIME file if it exists
     let lastUpdateTime = null
@@ -22938,6 +23005,27 @@ app.get('/api/admin/visitors-stats', async (req, res) => {
           const daysParam = Number(req.query.days || 7)
           const days = (daysParam === 30 ? 30 : 7)
 
+          // One RPC returns every figure; databases synced before it existed fall through to the per-figure RPCs
+          const dash = await fetch(`${supabaseUrlEnv}/rest/v1/rpc/get_visitors_dashboard`, { method: 'POST', headers, body: JSON.stringify({ _days: days }) })
+          const dashJson = dash.ok ? await dash.json().catch(() => null) : null
+          if (dashJson && typeof dashJson === 'object') {
+            const series7d = Array.isArray(dashJson.series)
+              ? dashJson.series.map((r) => ({ date: String(r.date), uniqueVisitors: Number(r.unique_visitors ?? 0) }))
+              : []
+            res.json({
+              ok: true,
+              currentUniqueVisitors10m: Number(dashJson.currentUniqueVisitors10m) || 0,
+              uniqueIpsLast30m: Number(dashJson.uniqueIpsLast30m) || 0,
+              uniqueIpsLast60m: Number(dashJson.uniqueIpsLast60m) || 0,
+              visitsLast60m: Number(dashJson.visitsLast60m) || 0,
+              uniqueIps7d: Number(dashJson.uniqueIpsNd) || 0,
+              series7d,
+              via: 'supabase',
+              days,
+            })
+            return
+          }
+
           const [c10, c30, c60u, c60v, uN, sN] = await Promise.all([
             fetch(`${supabaseUrlEnv}/rest/v1/rpc/count_unique_ips_last_minutes`, { method: 'POST', headers, body: JSON.stringify({ _minutes: 10 }) }),
             fetch(`${supabaseUrlEnv}/rest/v1/rpc/count_unique_ips_last_minutes`, { method: 'POST', headers, body: JSON.stringify({ _minutes: 30 }) }),
@@ -22981,7 +23069,8 @@ app.get('/api/admin/visitors-stats', async (req, res) => {
 
     const daysParam = Number(req.query.days || 7)
     const days = (daysParam === 30 ? 30 : 7)
-    const [rows10m, rows30m, rows60mUnique, rows60mRaw, rowsNdUnique] = await Promise.all([
+    // All six queries go out together; the daily series used to wait for the counts
+    const [rows10m, rows30m, rows60mUnique, rows60mRaw, rowsNdUnique, rows7] = await Promise.all([
       sql.unsafe(`select count(distinct v.ip_address)::int as c from ${VISITS_TABLE_SQL_IDENT} v where v.ip_address is not null and v.occurred_at >= now() - interval '10 minutes'`),
       sql.unsafe(`select count(distinct v.ip_address)::int as c from ${VISITS_TABLE_SQL_IDENT} v where v.ip_address is not null and v.occurred_at >= now() - interval '30 minutes'`),
       sql.unsafe(`select count(distinct v.ip_address)::int as c from ${VISITS_TABLE_SQL_IDENT} v where v.ip_address is not null and v.occurred_at >= now() - interval '60 minutes'`),
@@ -22990,7 +23079,19 @@ app.get('/api/admin/visitors-stats', async (req, res) => {
       sql.unsafe(`select count(distinct v.ip_address)::int as c
                   from ${VISITS_TABLE_SQL_IDENT} v
                   where v.ip_address is not null
-                    and timezone('utc', v.occurred_at) >= ((now() at time zone 'utc')::date - interval '${days - 1} days')`)
+                    and timezone('utc', v.occurred_at) >= ((now() at time zone 'utc')::date - interval '${days - 1} days')`),
+      sql.unsafe(
+        `with days as (
+           select generate_series(((now() at time zone 'utc')::date - interval '${days - 1} days'), (now() at time zone 'utc')::date, interval '1 day')::date as d
+         )
+         select to_char(d, 'YYYY-MM-DD') as date,
+                coalesce((
+                  select count(distinct v.ip_address)
+                  from ${VISITS_TABLE_SQL_IDENT} v
+                  where (timezone('utc', v.occurred_at))::date = d
+                ), 0)::int as unique_visitors
+         from days
+         order by d asc`),
     ])
 
     const currentUniqueVisitors10m = rows10m?.[0]?.c ?? 0
@@ -22999,18 +23100,6 @@ app.get('/api/admin/visitors-stats', async (req, res) => {
     const visitsLast60m = rows60mRaw?.[0]?.c ?? 0
     const uniqueIps7d = rowsNdUnique?.[0]?.c ?? 0
 
-    const rows7 = await sql.unsafe(
-      `with days as (
-         select generate_series(((now() at time zone 'utc')::date - interval '${days - 1} days'), (now() at time zone 'utc')::date, interval '1 day')::date as d
-       )
-       select to_char(d, 'YYYY-MM-DD') as date,
-              coalesce((
-                select count(distinct v.ip_address)
-                from ${VISITS_TABLE_SQL_IDENT} v
-                where (timezone('utc', v.occurred_at))::date = d
-              ), 0)::int as unique_visitors
-       from days
-       order by d asc`)
     const series7d = (rows7 || []).map(r => ({ date: String(r.date), uniqueVisitors: Number(r.unique_visitors || 0) }))
 
     res.json({ ok: true, currentUniqueVisitors10m, uniqueIpsLast30m, uniqueIpsLast60m, visitsLast60m, uniqueIps7d, series7d, via: 'database', days })
@@ -23075,6 +23164,40 @@ app.get('/api/admin/visitors-unique-7d', async (req, res) => {
   }
 })
 
+// Splits full country/referrer lists into the top 5 plus an "other" aggregate; only used when
+// get_sources_breakdown is missing because the schema has not been synced yet
+function splitSourcesBreakdown(countries, referrers) {
+  const allCountries = (Array.isArray(countries) ? countries : []).map((r) => ({ country: String(r.country || ''), visits: Number(r.visits || 0) })).filter(c => !!c.country)
+  const allReferrers = (Array.isArray(referrers) ? referrers : []).map((r) => ({ source: String(r.source || 'direct'), visits: Number(r.visits || 0) }))
+  allCountries.sort((a, b) => (b.visits || 0) - (a.visits || 0))
+  allReferrers.sort((a, b) => (b.visits || 0) - (a.visits || 0))
+  const topCountries = allCountries.slice(0, 5)
+  const otherCountriesList = allCountries.slice(5)
+  const otherCountries = {
+    count: otherCountriesList.length,
+    visits: otherCountriesList.reduce((s, c) => s + (c.visits || 0), 0),
+    codes: otherCountriesList.map(c => c.country).filter(Boolean),
+    items: otherCountriesList.map(c => ({ country: c.country, visits: Number(c.visits || 0) })),
+  }
+  const topReferrers = allReferrers.slice(0, 5)
+  const otherReferrersList = allReferrers.slice(5)
+  const otherReferrers = { count: otherReferrersList.length, visits: otherReferrersList.reduce((s, c) => s + (c.visits || 0), 0) }
+  return { topCountries, otherCountries, topReferrers, otherReferrers }
+}
+
+function normalizeSourcesBreakdown(data) {
+  const other = (o) => ({ count: Number(o?.count) || 0, visits: Number(o?.visits) || 0 })
+  const otherCountries = other(data.otherCountries)
+  otherCountries.codes = Array.isArray(data.otherCountries?.codes) ? data.otherCountries.codes : []
+  otherCountries.items = Array.isArray(data.otherCountries?.items) ? data.otherCountries.items : []
+  return {
+    topCountries: Array.isArray(data.topCountries) ? data.topCountries : [],
+    otherCountries,
+    topReferrers: Array.isArray(data.topReferrers) ? data.topReferrers : [],
+    otherReferrers: other(data.otherReferrers),
+  }
+}
+
 // Admin: breakdown of where visitors come from (top countries and top referrers)
 app.get('/api/admin/sources-breakdown', async (req, res) => {
   const uid = await ensureAdmin(req, res)
@@ -23084,26 +23207,21 @@ app.get('/api/admin/sources-breakdown', async (req, res) => {
     if (sql) {
       const daysParam = Number(req.query.days || 30)
       const days = (daysParam === 7 ? 7 : 30)
-      const [countries, referrers] = await Promise.all([
-        sql`select * from public.get_top_countries(${days}, ${10000})`,
-        sql`select * from public.get_top_referrers(${days}, ${10})`,
-      ])
-      const allCountries = (countries || []).map(r => ({ country: (r.country || ''), visits: Number(r.visits || 0) })).filter(c => c.country)
-      const allReferrers = (referrers || []).map(r => ({ source: String(r.source || 'direct'), visits: Number(r.visits || 0) }))
-      allCountries.sort((a, b) => (b.visits || 0) - (a.visits || 0))
-      allReferrers.sort((a, b) => (b.visits || 0) - (a.visits || 0))
-      const topCountries = allCountries.slice(0, 5)
-      const otherCountriesList = allCountries.slice(5)
-      const otherCountries = {
-        count: otherCountriesList.length,
-        visits: otherCountriesList.reduce((s, c) => s + (c.visits || 0), 0),
-        codes: otherCountriesList.map(c => c.country).filter(Boolean),
-        items: otherCountriesList.map(c => ({ country: c.country, visits: Number(c.visits || 0) })),
-      }
-      const topReferrers = allReferrers.slice(0, 5)
-      const otherReferrersList = allReferrers.slice(5)
-      const otherReferrers = { count: otherReferrersList.length, visits: otherReferrersList.reduce((s, c) => s + (c.visits || 0), 0) }
-      res.json({ ok: true, topCountries, otherCountries, topReferrers, otherReferrers, via: 'database', days })
+      let breakdown
+      try {
+        const rows = await sql`select public.get_sources_breakdown(${days}, ${5}) as data`
+        const data = rows?.[0]?.data
+        breakdown = normalizeSourcesBreakdown(typeof data === 'string' ? JSON.parse(data) : (data || {}))
+      } catch (e) {
+        // 42883 = undefined_function: database synced before get_sources_breakdown existed
+        if (e?.code !== '42883') throw e
+        const [countries, referrers] = await Promise.all([
+          sql`select * from public.get_top_countries(${days}, ${10000})`,
+          sql`select * from public.get_top_referrers(${days}, ${10})`,
+        ])
+        breakdown = splitSourcesBreakdown(countries, referrers)
+      }
+      res.json({ ok: true, ...breakdown, via: 'database', days })
       return
     }
 
@@ -23113,29 +23231,20 @@ app.get('/api/admin/sources-breakdown', async (req, res) => {
       if (token) headers.Authorization = `Bearer ${token}`
       const daysParam = Number(req.query.days || 30)
       const days = (daysParam === 7 ? 7 : 30)
-      // Prefer RPCs for reliable grouping
+      // One RPC returns only the top rows plus "other" totals; older schemas fall through to the full lists
+      const br = await fetch(`${supabaseUrlEnv}/rest/v1/rpc/get_sources_breakdown`, { method: 'POST', headers, body: JSON.stringify({ _days: days, _top: 5 }) })
+      const bData = br.ok ? await br.json().catch(() => null) : null
+      if (bData && typeof bData === 'object' && !Array.isArray(bData)) {
+        res.json({ ok: true, ...normalizeSourcesBreakdown(bData), via: 'supabase', days })
+        return
+      }
       const [cr, rr] = await Promise.all([
         fetch(`${supabaseUrlEnv}/rest/v1/rpc/get_top_countries`, { method: 'POST', headers, body: JSON.stringify({ _days: days, _limit: 10000 }) }),
         fetch(`${supabaseUrlEnv}/rest/v1/rpc/get_top_referrers`, { method: 'POST', headers, body: JSON.stringify({ _days: days, _limit: 10 }) }),
       ])
       const cData = cr.ok ? await cr.json().catch(() => []) : []
       const rData = rr.ok ? await rr.json().catch(() => []) : []
-      const allCountries = (Array.isArray(cData) ? cData : []).map((r) => ({ country: String(r.country || ''), visits: Number(r.visits || 0) })).filter(c => !!c.country)
-      const allReferrers = (Array.isArray(rData) ? rData : []).map((r) => ({ source: String(r.source || 'direct'), visits: Number(r.visits || 0) }))
-      allCountries.sort((a, b) => (b.visits || 0) - (a.visits || 0))
-      allReferrers.sort((a, b) => (b.visits || 0) - (a.visits || 0))
-      const topCountries = allCountries.slice(0, 5)
-      const otherCountriesList = allCountries.slice(5)
-      const otherCountries = {
-        count: otherCountriesList.length,
-        visits: otherCountriesList.reduce((s, c) => s + (c.visits || 0), 0),
-        codes: otherCountriesList.map(c => c.country).filter(Boolean),
-        items: otherCountriesList.map(c => ({ country: c.country, visits: Number(c.visits || 0) })),
-      }
-      const topReferrers = allReferrers.slice(0, 5)
-      const otherReferrersList = allReferrers.slice(5)
-      const otherReferrers = { count: otherReferrersList.length, visits: otherReferrersList.reduce((s, c) => s + (c.visits || 0), 0) }
-      res.json({ ok: true, topCountries, otherCountries, topReferrers, otherReferrers, via: 'supabase', days })
+      res.json({ ok: true, ...splitSourcesBreakdown(cData, rData), via: 'supabase', days })
       return
     }
 
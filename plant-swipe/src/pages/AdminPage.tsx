@@ -1188,6 +1188,8 @@ export const AdminPage: React.FC = () => {
           body.results.forEach((result: { file: string; status: string; duration: string; error?: string; detail?: string; hint?: string }) => {
             if (result.status === 'success') {
               appendConsole(`[sync] ✓ ${result.file} (${result.duration})`);
+            } else if (result.status === 'skipped') {
+              appendConsole(`[sync] – ${result.file} skipped`);
             } else {
               appendConsole(`[sync] ✗ ${result.file} FAILED (${result.duration})`);
               if (result.error) {
@@ -1251,6 +1253,8 @@ export const AdminPage: React.FC = () => {
         body.results.forEach((result: { file: string; status: string; duration: string; error?: string; detail?: string; hint?: string }) => {
           if (result.status === 'success') {
             appendConsole(`[sync] ✓ ${result.file} (${result.duration})`);
+          } else if (result.status === 'skipped') {
+            appendConsole(`[sync] – ${result.file} skipped`);
           } else {
             appendConsole(`[sync] ✗ ${result.file} FAILED (${result.duration})`);
             if (result.error) {
@@ -4847,7 +4851,9 @@ export const AdminPage: React.FC = () => {
         } catch {}
         // Add cache-busting query param and disable caching to ensure fresh data
         const cacheBuster = `_t=${Date.now()}`;
-        const respNode = await fetchWithRetry(`/api/admin/branches?${cacheBuster}`, {
+        // Manual refreshes ask the server to fetch from origin even if it did so recently
+        const refreshParam = isInitial ? "" : "&refresh=1";
+        const respNode = await fetchWithRetry(`/api/admin/branches?${cacheBuster}${refreshParam}`, {
           headers: headersNode,
           credentials: "same-origin",
           cache: "no-store",
@@ -4874,7 +4880,7 @@ export const AdminPage: React.FC = () => {
           } catch {}
           // Add cache-busting query param and disable caching to ensure fresh data
           const adminCacheBuster = `_t=${Date.now()}`;
-          const respAdmin = await fetchWithRetry(`/admin/branches?${adminCacheBuster}`, {
+          const respAdmin = await fetchWithRetry(`/admin/branches?${adminCacheBuster}${refreshParam}`, {
             headers: adminHeaders,
             credentials: "same-origin",
             cache: "no-store",
@@ -245,6 +245,29 @@ as $$
 $$;
 grant execute on function public.get_visitors_series_days(integer) to anon, authenticated;
 
+-- Every figure of the admin visitors dashboard in one call, so the server's
+-- REST fallback needs a single round trip instead of six
+create or replace function public.get_visitors_dashboard(_days integer default 7)
+returns json
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select json_build_object(
+    'currentUniqueVisitors10m', public.count_unique_ips_last_minutes(10),
+    'uniqueIpsLast30m', public.count_unique_ips_last_minutes(30),
+    'uniqueIpsLast60m', public.count_unique_ips_last_minutes(60),
+    'visitsLast60m', public.count_visits_last_minutes(60),
+    'uniqueIpsNd', public.count_unique_ips_last_days(_days),
+    'series', coalesce((
+      select json_agg(json_build_object('date', s.date, 'unique_visitors', s.unique_visitors) order by s.date)
+      from public.get_visitors_series_days(_days) s
+    ), '[]'::json)
+  );
+$$;
+grant execute on function public.get_visitors_dashboard(integer) to anon, authenticated;
+
 -- Top countries in last N days (default 30)
 create or replace function public.get_top_countries(_days integer default 30, _limit integer default 10)
 returns table(country text, visits integer)
@@ -292,6 +315,50 @@ as $$
 $$;
 grant execute on function public.get_top_referrers(integer, integer) to anon, authenticated;
 
+-- Sources breakdown for the admin dashboard: top N countries/referrers plus an "other" aggregate,
+-- so callers receive a handful of rows instead of every country
+create or replace function public.get_sources_breakdown(_days integer default 30, _top integer default 5)
+returns json
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  with lim as (
+    select greatest(1, coalesce(_top, 5)) as n
+  ), countries as (
+    select row_number() over (order by c.visits desc, c.country) as rn, c.country, c.visits
+    from public.get_top_countries(_days, 10000) c
+  ), referrers as (
+    select row_number() over (order by r.visits desc, r.source) as rn, r.source, r.visits
+    from public.get_top_referrers(_days, 10000) r
+  )
+  select json_build_object(
+    'topCountries', coalesce((
+      select json_agg(json_build_object('country', country, 'visits', visits) order by rn)
+      from countries where rn <= (select n from lim)
+    ), '[]'::json),
+    'otherCountries', (
+      select json_build_object(
+        'count', count(*),
+        'visits', coalesce(sum(visits), 0),
+        'codes', coalesce(json_agg(country order by rn), '[]'::json),
+        'items', coalesce(json_agg(json_build_object('country', country, 'visits', visits) order by rn), '[]'::json)
+      )
+      from countries where rn > (select n from lim)
+    ),
+    'topReferrers', coalesce((
+      select json_agg(json_build_object('source', source, 'visits', visits) order by rn)
+      from referrers where rn <= (select n from lim)
+    ), '[]'::json),
+    'otherReferrers', (
+      select json_build_object('count', count(*), 'visits', coalesce(sum(visits), 0))
+      from referrers where rn > (select n from lim)
+    )
+  );
+$$;
+grant execute on function public.get_sources_breakdown(integer, integer) to anon, authenticated;
+
 -- User-specific daily visit counts for last N days (default 30)
 create or replace function public.get_user_visits_series_days(_user_id uuid, _days integer default 30)
 returns table(date text, visits integer)
@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+from playwright.sync_api import BrowserContext, sync_playwright
+
+MOCK_ENV_SCRIPT = """
+    window.__ENV__ = {
+        VITE_SUPABASE_URL: 'https://mock.supabase.co',
+        VITE_SUPABASE_ANON_KEY: 'mock-key'
+    };
+"""
+
+
+@contextmanager
+def browser_or_launch(browser=None):
+    """Yield ``browser`` when the runner shares one, else launch (and close) a private one."""
+    if browser is not None:
+        yield browser
+        return
+    with sync_playwright() as p:
+        own = p.chromium.launch(headless=True)
+        try:
+            yield own
+        finally:
+            own.close()
+
+
+def install_supabase_mocks(context: BrowserContext, routes: dict = None) -> None:
+    """Inject the mock env and register Supabase REST mocks once for every page of ``context``.
+
+    ``routes`` maps a URL glob to the JSON body it should be answered with.
+    """
+    context.add_init_script(MOCK_ENV_SCRIPT)
+    for pattern, body in (routes or {}).items():
+        context.route(pattern, lambda route, body=body: route.fulfill(status=200, json=body))
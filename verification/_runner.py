@@ -0,0 +1,32 @@
+"""Run the browser verification scripts against one shared Chromium instance.
+
+Each script still runs on its own (``python verification/verify_layout.py``);
+going through this runner pays the browser start-up once, and every check gets
+a fresh context. Start the Vite dev server on :5173 first.
+"""
+from playwright.sync_api import sync_playwright
+
+from test_aphylia_chat import verify_aphylia_chat_aria_labels
+from verify_image_viewer import verify_image_viewer
+from verify_layout import verify_layout
+
+CHECKS = (
+    verify_layout,
+    verify_image_viewer,
+    verify_aphylia_chat_aria_labels,
+)
+
+
+def main() -> None:
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            for check in CHECKS:
+                print(f"== {check.__name__}")
+                check(browser)
+        finally:
+            browser.close()
+
+
+if __name__ == "__main__":
+    main()
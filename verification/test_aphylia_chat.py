@@ -1,14 +1,14 @@
-from playwright.sync_api import sync_playwright
+from _common import browser_or_launch
 
-def verify_aphylia_chat_aria_labels():
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
+def verify_aphylia_chat_aria_labels(browser=None):
+    with browser_or_launch(browser) as browser:
+        context = browser.new_context()
+        page = context.new_page()
         page.goto('http://localhost:5173')
 
         # Take a screenshot
         page.screenshot(path="verification/dashboard.png")
-        browser.close()
+        context.close()
 
 if __name__ == "__main__":
     verify_aphylia_chat_aria_labels()
@@ -1,26 +1,22 @@
-from playwright.sync_api import sync_playwright
-import time
+from _common import browser_or_launch, install_supabase_mocks
 
-def verify_layout():
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
+def verify_layout(browser=None):
+    with browser_or_launch(browser) as browser:
         context = browser.new_context(viewport={"width": 1280, "height": 800})
-        page = context.new_page()
-
         # Inject mock environment variables
-        page.add_init_script("""
-            window.__ENV__ = {
-                VITE_SUPABASE_URL: 'https://mock.supabase.co',
-                VITE_SUPABASE_ANON_KEY: 'mock-key'
-            };
-        """)
+        install_supabase_mocks(context)
+        page = context.new_page()
 
         # Go to search page to see TopBar and Footer (TopBar is visible on desktop)
         print("Navigating to /search...")
         page.goto("http://127.0.0.1:5173/search")
 
-        # Wait for page load
-        time.sleep(2)
+        # Wait for the app shell to render rather than a fixed delay
+        page.wait_for_load_state("domcontentloaded")
+        try:
+            page.get_by_role("link", name="Aphylia").first.wait_for(state="visible", timeout=10000)
+        except Exception as e:
+            print(f"App shell did not render in time: {e}")
 
         # Handle cookie consent if present
         try:
@@ -28,7 +24,7 @@ def verify_layout():
             if reject_btn.is_visible():
                 reject_btn.click()
                 print("Clicked Reject all cookies")
-                time.sleep(1)
+                reject_btn.wait_for(state="hidden", timeout=5000)
         except Exception as e:
             print(f"Cookie consent handling skipped: {e}")
 
@@ -55,7 +51,7 @@ def verify_layout():
         page.screenshot(path=screenshot_path, full_page=True)
         print(f"Screenshot saved to {screenshot_path}")
 
-        browser.close()
+        context.close()
 
 if __name__ == "__main__":
     verify_layout()